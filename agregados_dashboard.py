@@ -0,0 +1,185 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from graficos_eda import agregar_histograma
+
+
+# ==========================================================
+# 📈 Agregados do Dashboard calculados no servidor
+# ==========================================================
+# O navegador só recebe resumos de tamanho fixo (bins, quantis, grade de
+# densidade, amostra limitada, coeficientes da reta), nunca as linhas do df.
+# Tudo fica em cache por (dataset, colunas), então trocar de aba ou mexer em
+# outro widget não recalcula nada.
+GRADE_DENSIDADE = 100
+MAX_PONTOS_DISPERSAO = 5000
+MAX_OUTLIERS = 500
+TOP_CRUZAMENTO = 20
+TOP_CRUZAMENTO_COR = 10
+MAX_AGREGADOS = 256
+
+_agregados = OrderedDict()
+_trava = threading.Lock()
+
+
+def _em_cache(chave, funcao):
+    with _trava:
+        if chave in _agregados:
+            _agregados.move_to_end(chave)
+            return _agregados[chave]
+
+    valor = funcao()
+
+    with _trava:
+        _agregados[chave] = valor
+        while len(_agregados) > MAX_AGREGADOS:
+            _agregados.popitem(last=False)
+
+    return valor
+
+
+def _valores(df, col):
+    # float64 sem cópia para colunas float; inteiros anuláveis/bool viram NaN/0-1
+    return df[col].to_numpy(dtype="float64", na_value=np.nan)
+
+
+def histograma_dashboard(df, col, chave_dados):
+    def calcular():
+        hist = agregar_histograma(_valores(df, col))
+        if hist is None:
+            return None
+
+        arestas = hist["arestas"]
+        return {
+            "centros": (arestas[:-1] + arestas[1:]) / 2,
+            "larguras": np.diff(arestas),
+            "contagens": hist["contagens"],
+        }
+
+    return _em_cache((chave_dados, "histograma", col), calcular)
+
+
+def quantis_boxplot(df, col, chave_dados):
+    def calcular():
+        valores = _valores(df, col)
+        valores = valores[np.isfinite(valores)]
+        if len(valores) == 0:
+            return None
+
+        q1, mediana, q3 = np.percentile(valores, [25, 50, 75])
+        iqr = q3 - q1
+        dentro = (valores >= q1 - 1.5 * iqr) & (valores <= q3 + 1.5 * iqr)
+        fora = np.sort(valores[~dentro])
+
+        # Outliers espaçados ao longo da ordem: mantém os extremos e a densidade
+        if len(fora) > MAX_OUTLIERS:
+            fora = fora[np.linspace(0, len(fora) - 1, MAX_OUTLIERS).astype(int)]
+
+        return {
+            "q1": q1,
+            "mediana": mediana,
+            "q3": q3,
+            "cerca_inferior": valores[dentro].min(),
+            "cerca_superior": valores[dentro].max(),
+            "media": valores.mean(),
+            "n": len(valores),
+            "outliers": fora,
+            "total_outliers": int((~dentro).sum()),
+        }
+
+    return _em_cache((chave_dados, "boxplot", col), calcular)
+
+
+def _tendencia_ols(x, y):
+    # Mínimos quadrados em forma fechada: uma passada, sem statsmodels
+    mx, my = x.mean(), y.mean()
+    dx, dy = x - mx, y - my
+    sxx, sxy, syy = (dx * dx).sum(), (dx * dy).sum(), (dy * dy).sum()
+
+    if sxx == 0:
+        return None
+
+    inclinacao = sxy / sxx
+    return {
+        "inclinacao": inclinacao,
+        "intercepto": my - inclinacao * mx,
+        "r2": sxy ** 2 / (sxx * syy) if syy > 0 else np.nan,
+    }
+
+
+def dispersao_agregada(df, x, y, chave_dados):
+    def calcular():
+        xv, yv = _valores(df, x), _valores(df, y)
+        validos = np.isfinite(xv) & np.isfinite(yv)
+        xv, yv = xv[validos], yv[validos]
+
+        resultado = {"n": len(xv), "tendencia": None, "densidade": None, "pontos": None}
+        if len(xv) == 0:
+            return resultado
+
+        resultado["tendencia"] = _tendencia_ols(xv, yv)
+        resultado["x_min"], resultado["x_max"] = xv.min(), xv.max()
+
+        if len(xv) <= MAX_PONTOS_DISPERSAO:
+            resultado["pontos"] = pd.DataFrame({x: xv, y: yv})
+            return resultado
+
+        # Grade de densidade + um ponto representante por célula ocupada
+        # (amostra estratificada: outliers isolados continuam visíveis)
+        contagens, arestas_x, arestas_y = np.histogram2d(xv, yv, bins=GRADE_DENSIDADE)
+        ix = np.clip(np.searchsorted(arestas_x, xv, side="right") - 1, 0, GRADE_DENSIDADE - 1)
+        iy = np.clip(np.searchsorted(arestas_y, yv, side="right") - 1, 0, GRADE_DENSIDADE - 1)
+        _, primeiros = np.unique(ix * GRADE_DENSIDADE + iy, return_index=True)
+
+        resultado["densidade"] = {
+            "x": (arestas_x[:-1] + arestas_x[1:]) / 2,
+            "y": (arestas_y[:-1] + arestas_y[1:]) / 2,
+            "contagens": contagens.T,
+        }
+        resultado["pontos"] = pd.DataFrame({x: xv[primeiros], y: yv[primeiros]})
+
+        return resultado
+
+    return _em_cache((chave_dados, "dispersao", x, y), calcular)
+
+
+def frequencias(df, perfil, col, chave_dados):
+    def calcular():
+        contagens = perfil["contagens"].get(col)
+        if contagens is None:
+            contagens = df[col].value_counts()
+
+        # O perfil guarda só as MAX_CATEGORIAS mais frequentes: o resto vira uma
+        # linha "Outros" para que totais e percentuais continuem corretos
+        total = int(perfil["linhas"] - perfil["faltantes"][col])
+        restante = total - int(contagens.sum())
+        tabela = pd.DataFrame({col: contagens.index.astype(object), "Quantidade": contagens.to_numpy()})
+
+        if restante > 0:
+            outras = int(perfil["nunique"][col]) - len(contagens)
+            tabela.loc[len(tabela)] = [f"Outros ({outras} categorias)", restante]
+
+        tabela["Percentual"] = tabela["Quantidade"] / max(total, 1) * 100
+        return tabela
+
+    return _em_cache((chave_dados, "frequencias", col), calcular)
+
+
+def _agrupar_topo(serie, k):
+    # Categorias além das k mais frequentes viram "Outros"
+    topo = serie.value_counts().index[:k]
+    return serie.astype(object).where(serie.isin(topo) | serie.isna(), "Outros")
+
+
+def cruzamento(df, col, outra, chave_dados):
+    def calcular():
+        a = _agrupar_topo(df[col], TOP_CRUZAMENTO)
+        b = _agrupar_topo(df[outra], TOP_CRUZAMENTO_COR)
+        tabela = pd.DataFrame({col: a, outra: b}).groupby([col, outra]).size().reset_index(name="Contagem")
+        tabela[outra] = tabela[outra].astype(str)
+        return tabela
+
+    return _em_cache((chave_dados, "cruzamento", col, outra), calcular)
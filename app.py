@@ -1,69 +1,56 @@
+import json
+
 import streamlit as st
 import pandas as pd
+import numpy as np
 
+from agregados_dashboard import cruzamento, dispersao_agregada, frequencias, histograma_dashboard, quantis_boxplot
 from autoeda import gerar_relatorio_eda
+from cache_pipeline import chave_conteudo, estatisticas_cache, obter_ou_calcular
 from data_cleaning import autofix_csv
+from fila_tarefas import id_tarefa_para, resultado_tarefa, submeter
 from insights_engine import gerar_insights
+from leitura_csv import ler_csv
+from painel_tarefas import painel_tarefa
+from perfil_dados import calcular_perfil, fingerprint_df, obter_perfil
+from relatorio_html import arquivo_por_dados, gerar_relatorio_html
+
+
+LIMITE_MEMORIA_MB = 4096
+CONFIG_LIMPEZA = {"limite_memoria_mb": LIMITE_MEMORIA_MB, "retornar_esquema": True}
 
 
 # ==========================================================
 # 🔧 Funções Utilitárias
 # ==========================================================
-def limpar_header(df):
-    colunas_corrigidas = []
-
-    for col in df.columns:
-        if not isinstance(col, str):
-            col = str(col)
-
-        col = (
-            col.replace('"', '')
-               .replace("'", "")
-               .strip()
-               .replace(" ", "_")
-               .replace("\n", "")
-               .replace("\t", "")
-        )
-
-        if col == "" or col.lower().startswith("unnamed"):
-            col = None
-
-        colunas_corrigidas.append(col)
+def ler_csv_inteligente(uploaded_file):
+    df, info = ler_csv(uploaded_file, limite_memoria_mb=LIMITE_MEMORIA_MB)
+    return df, info
 
-    df.columns = colunas_corrigidas
-    df = df.loc[:, df.columns.notnull()]
-    return df
 
+def processar_upload(uploaded_file):
+    df, info_leitura = ler_csv_inteligente(uploaded_file)
 
-def ler_csv_inteligente(uploaded_file):
-    try:
-        uploaded_file.seek(0)
-        df = pd.read_csv(uploaded_file, engine="python")
-        if df.shape[1] > 1:
-            return df
-    except:
-        pass
+    # autofix_csv também corrige o cabeçalho e devolve o esquema de limpeza
+    df_tratado, relatorio, esquema = autofix_csv(df, retornar_esquema=True)
+    df_tratado = df_tratado.loc[:, ~df_tratado.columns.str.contains("Unnamed")]
 
-    uploaded_file.seek(0)
-    raw = uploaded_file.read().decode("utf-8", errors="ignore")
-    linhas_raw = raw.splitlines()
+    return df_tratado, relatorio, esquema, info_leitura
 
-    if len(linhas_raw) == 0:
-        return pd.DataFrame()
 
-    linhas = [linha.split(",") for linha in linhas_raw]
-    max_cols = max(len(l) for l in linhas)
-    linhas_norm = [l + [""] * (max_cols - len(l)) for l in linhas]
+def chave_do_df(df):
+    # Hash do upload quando o df veio dele; senão, hash do conteúdo completo
+    chave = st.session_state.get("chave_df")
+    return chave if chave and st.session_state.get("df") is df else fingerprint_df(df)
 
-    header = [h.replace('"', '').replace("'", "").strip() for h in linhas_norm[0]]
-    corpo = linhas_norm[1:]
 
-    try:
-        df = pd.DataFrame(corpo, columns=header)
-    except:
-        df = pd.DataFrame(corpo, columns=[f"col_{i}" for i in range(max_cols)])
+def processar_upload_com_cache(uploaded_file):
+    # Guardar o hash por file_id: reruns com o mesmo arquivo não relêem os bytes
+    hashes = st.session_state.setdefault("hash_upload", {})
+    if uploaded_file.file_id not in hashes:
+        hashes[uploaded_file.file_id] = chave_conteudo(uploaded_file, CONFIG_LIMPEZA)
 
-    return df
+    return obter_ou_calcular(hashes[uploaded_file.file_id], lambda: processar_upload(uploaded_file))
 
 
 # ==========================================================
@@ -94,6 +81,7 @@ pagina = st.sidebar.selectbox(
 )
 
 st.sidebar.markdown("---")
+painel_cache = st.sidebar.empty()
 
 
 # ==========================================================
@@ -107,17 +95,35 @@ if pagina == "📂 Upload & Limpeza":
     if uploaded_file:
         st.info("Tentando leitura inteligente do arquivo...")
 
-        df = ler_csv_inteligente(uploaded_file)
-        df = limpar_header(df)
+        df_tratado, relatorio, esquema, info_leitura = processar_upload_com_cache(uploaded_file)
 
-        df_tratado, relatorio = autofix_csv(df)
-        df_tratado = df_tratado.loc[:, ~df_tratado.columns.str.contains("Unnamed")]
+        st.caption(
+            f"Delimitador `{info_leitura['delimitador']}` · codificação {info_leitura['codificacao']} · "
+            f"{info_leitura['linhas']} linhas em {info_leitura['segundos']}s "
+            f"({info_leitura['linhas_por_segundo']} linhas/s)"
+        )
+        if info_leitura["linhas_descartadas"]:
+            st.warning(
+                f"⚠ {info_leitura['linhas_descartadas']} linha(s) com número de campos maior que o cabeçalho "
+                "foram descartadas na leitura."
+            )
+            st.code("\n".join(info_leitura["exemplos_descartados"]))
+        if info_leitura["modo_tolerante"]:
+            st.warning(
+                f"⚠ O arquivo não pôde ser lido normalmente ({info_leitura['erro_leitura']}); "
+                "foi relido em modo tolerante, com aspas tratadas como texto."
+            )
+        if info_leitura["truncado"]:
+            st.warning(f"⚠ Limite de memória de {LIMITE_MEMORIA_MB} MB atingido — apenas parte do arquivo foi carregada.")
 
         st.success("✔ Arquivo carregado e tratado com sucesso!")
         st.dataframe(df_tratado.head())
 
         # Armazenar no estado da sessão
         st.session_state["df"] = df_tratado
+        st.session_state["esquema"] = esquema
+        # Hash do arquivo enviado (+ configuração): identifica o df tratado sem rehash
+        st.session_state["chave_df"] = st.session_state["hash_upload"][uploaded_file.file_id]
 
 
 # ==========================================================
@@ -130,12 +136,51 @@ elif pagina == "📊 Auto-EDA":
         st.warning("⚠ Envie e limpe os dados primeiro na aba 'Upload & Limpeza'.")
     else:
         df = st.session_state["df"]
+        chave_df = chave_do_df(df)
+
+        # Perfil calculado num processo separado; a mesma base em outra sessão
+        # (ou depois de trocar de página) reaproveita o resultado salvo
+        id_eda = id_tarefa_para("eda", chave_df)
 
         st.write("Clique para gerar o relatório completo de EDA:")
         if st.button("📊 Gerar Auto-EDA"):
-            st.info("⏳ Gerando relatório, aguarde...")
-            gerar_relatorio_eda(df)
-            st.success("📄 Relatório gerado com sucesso!")
+            submeter(calcular_perfil, df, tipo="eda", chave=chave_df, descricao="Perfil para Auto-EDA")
+            st.session_state["tarefa_eda"] = id_eda
+
+        if st.session_state.get("tarefa_eda") == id_eda:
+            perfil_eda = resultado_tarefa(id_eda)
+
+            if perfil_eda is None:
+                painel_tarefa(id_eda, "⏳ Gerando relatório")
+            else:
+                perfil_eda["fingerprint"] = chave_df
+                gerar_relatorio_eda(df, perfil=perfil_eda)
+                st.success("📄 Relatório gerado com sucesso!")
+
+        # Versão estática em reports/: só as colunas alteradas são renderizadas de novo
+        st.divider()
+        id_html = id_tarefa_para("relatorio_html", chave_df)
+
+        if st.button("💾 Exportar relatório HTML"):
+            submeter(
+                gerar_relatorio_html, df, tipo="relatorio_html", chave=chave_df, descricao="Relatório HTML",
+                arquivo=arquivo_por_dados(chave_df), incluir_html=True
+            )
+            st.session_state["tarefa_html"] = id_html
+
+        if st.session_state.get("tarefa_html") == id_html:
+            exportado = resultado_tarefa(id_html)
+
+            if exportado is None:
+                painel_tarefa(id_html, "💾 Exportando relatório")
+            else:
+                st.caption(
+                    f"📁 {exportado['caminho']} — {exportado['renderizadas']} colunas renderizadas, "
+                    f"{exportado['reaproveitadas']} reaproveitadas"
+                )
+                st.download_button(
+                    "⬇ Baixar relatório HTML", exportado["html"], file_name="relatorio_eda.html", mime="text/html"
+                )
 
 
 # ==========================================================
@@ -151,7 +196,7 @@ elif pagina == "🤖 Insights IA":
 
         if st.button("🔍 Gerar Insights"):
             st.info("🧠 Analisando dados, aguarde...")
-            insights = gerar_insights(df)
+            insights = gerar_insights(df, perfil=obter_perfil(df, chave_do_df(df)))
 
             st.subheader("✨ Insights encontrados:")
             for item in insights:
@@ -168,8 +213,11 @@ elif pagina == "📈 Dashboard Interativo":
         st.warning("⚠ Primeiro carregue os dados na aba 'Upload & Limpeza'.")
     else:
         df = st.session_state["df"]
+        perfil = obter_perfil(df, chave_do_df(df))
+        chave_dados = perfil["fingerprint"]
 
         import plotly.express as px
+        import plotly.graph_objects as go
 
         # -----------------------------
         # Seleção da coluna alvo
@@ -190,31 +238,80 @@ elif pagina == "📈 Dashboard Interativo":
         if pd.api.types.is_numeric_dtype(df[coluna]):
             st.markdown("## 🔢 Dashboard para variáveis numéricas")
 
+            # Gráficos montados a partir de agregados do servidor: o tamanho
+            # enviado ao navegador não depende do número de linhas
+
             # ---- COLUNA 1: Histograma ----
             with col1:
                 st.markdown("### 📊 Histograma")
-                fig = px.histogram(df, x=coluna)
+                hist = histograma_dashboard(df, coluna, chave_dados)
+                fig = go.Figure()
+                if hist is not None:
+                    fig.add_bar(x=hist["centros"], y=hist["contagens"], width=hist["larguras"], name=coluna)
+                fig.update_layout(xaxis_title=coluna, yaxis_title="count", bargap=0)
                 st.plotly_chart(fig, use_container_width=True)
 
             # ---- COLUNA 2: Boxplot ----
             with col2:
                 st.markdown("### 📉 Boxplot")
-                fig2 = px.box(df, y=coluna)
+                caixa = quantis_boxplot(df, coluna, chave_dados)
+                fig2 = go.Figure()
+                if caixa is not None:
+                    fig2.add_box(
+                        q1=[caixa["q1"]], median=[caixa["mediana"]], q3=[caixa["q3"]],
+                        lowerfence=[caixa["cerca_inferior"]], upperfence=[caixa["cerca_superior"]],
+                        mean=[caixa["media"]], x=[coluna], name=coluna
+                    )
+                    if len(caixa["outliers"]):
+                        fig2.add_scatter(
+                            x=[coluna] * len(caixa["outliers"]), y=caixa["outliers"], mode="markers",
+                            marker={"size": 4}, name="outliers", showlegend=False
+                        )
                 st.plotly_chart(fig2, use_container_width=True)
+                if caixa is not None and caixa["total_outliers"] > len(caixa["outliers"]):
+                    st.caption(f"Mostrando {len(caixa['outliers'])} de {caixa['total_outliers']} outliers")
 
             # ---- COLUNA 1: Relação com outra numérica ----
-            outras_num = df.select_dtypes(include=['int64', 'float64']).columns.drop(coluna)
+            outras_num = [c for c in perfil["numericas"] if c != coluna]
             if len(outras_num) > 0:
                 with col1:
                     outra = st.selectbox("📈 Comparar com:", outras_num)
-                    fig3 = px.scatter(df, x=coluna, y=outra, trendline="ols")
+                    dispersao = dispersao_agregada(df, coluna, outra, chave_dados)
+
+                    # Acima do limite: grade de densidade + um ponto por célula ocupada
+                    fig3 = go.Figure()
+                    if dispersao["densidade"] is not None:
+                        densidade = dispersao["densidade"]
+                        fig3.add_heatmap(
+                            x=densidade["x"], y=densidade["y"], z=np.log1p(densidade["contagens"]),
+                            colorscale="Blues", showscale=False, name="densidade"
+                        )
+                    if dispersao["pontos"] is not None:
+                        pontos = dispersao["pontos"]
+                        fig3.add_scattergl(
+                            x=pontos[coluna], y=pontos[outra], mode="markers", name="pontos",
+                            marker={"size": 4, "opacity": 0.6 if dispersao["densidade"] is None else 0.3}
+                        )
+
+                    # Reta OLS calculada no servidor (coeficientes em cache)
+                    tendencia = dispersao["tendencia"]
+                    if tendencia is not None:
+                        xs = np.array([dispersao["x_min"], dispersao["x_max"]])
+                        fig3.add_scatter(
+                            x=xs, y=tendencia["intercepto"] + tendencia["inclinacao"] * xs,
+                            mode="lines", name=f"OLS (R²={tendencia['r2']:.3f})"
+                        )
+                    fig3.update_layout(xaxis_title=coluna, yaxis_title=outra)
+
                     st.markdown("### 📈 Relação com outra variável")
                     st.plotly_chart(fig3, use_container_width=True)
+                    if dispersao["densidade"] is not None:
+                        st.caption(f"{dispersao['n']} linhas resumidas em grade de densidade + {len(dispersao['pontos'])} pontos")
 
             # ---- COLUNA 2: Heatmap de correlação ----
             with col2:
                 st.markdown("### 🔥 Correlação")
-                corr = df.select_dtypes(include=['int64', 'float64']).corr()
+                corr = perfil["corr"]
                 fig4 = px.imshow(corr, text_auto=True, color_continuous_scale="RdBu")
                 st.plotly_chart(fig4, use_container_width=True)
 
@@ -227,15 +324,13 @@ elif pagina == "📈 Dashboard Interativo":
             # ---- COLUNA 1: Contagem ----
             with col1:
                 st.markdown("### 📊 Frequência")
-                contagem = df[coluna].value_counts().reset_index()
-                contagem.columns = [coluna, "Quantidade"]
+                contagem = frequencias(df, perfil, coluna, chave_dados)
                 fig = px.bar(contagem, x=coluna, y="Quantidade")
                 st.plotly_chart(fig, use_container_width=True)
 
             # ---- COLUNA 2: Proporção ----
             with col2:
                 st.markdown("### 🧮 Proporção (%)")
-                contagem["Percentual"] = (contagem["Quantidade"] / contagem["Quantidade"].sum()) * 100
                 fig2 = px.pie(contagem, names=coluna, values="Percentual")
                 st.plotly_chart(fig2, use_container_width=True)
 
@@ -244,7 +339,8 @@ elif pagina == "📈 Dashboard Interativo":
 
             with col1:
                 outra = st.selectbox("📌 Cruzar com:", outras_cols)
-                crosstab = df.groupby([coluna, outra]).size().reset_index(name="Contagem")
+                # Agrupado em cache; categorias fora do topo viram "Outros"
+                crosstab = cruzamento(df, coluna, outra, chave_dados)
                 fig3 = px.bar(crosstab, x=coluna, y="Contagem", color=outra, barmode="group")
                 st.markdown("### 🧩 Distribuição Cruzada")
                 st.plotly_chart(fig3, use_container_width=True)
@@ -275,4 +371,23 @@ elif pagina == "📤 Exportar Dados":
             "text/csv"
         )
 
+        # Esquema de limpeza → aplicar em novos lotes do mesmo feed sem reinferir
+        if "esquema" in st.session_state:
+            st.download_button(
+                "🧩 Baixar Esquema de Limpeza",
+                json.dumps(st.session_state["esquema"], ensure_ascii=False, indent=2).encode('utf-8'),
+                "esquema_limpeza.json",
+                "application/json"
+            )
+
         st.success("✔ Pronto para baixar!")
+
+
+# ==========================================================
+# 🗄 Estatísticas do cache (preenchidas no fim da execução)
+# ==========================================================
+stats = estatisticas_cache()
+painel_cache.caption(
+    f"🗄 Cache de limpeza: {stats['acertos']} acertos · {stats['falhas']} falhas · "
+    f"{stats['entradas']} arquivos ({stats['memoria_mb']} MB)"
+)
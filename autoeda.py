@@ -3,89 +3,104 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from graficos_eda import desenhar_contagens, desenhar_histogramas, mostrar_figura, paginar
+from perfil_dados import fingerprint_df, obter_perfil
+
+MAX_COLUNAS_FALTANTES = 50
+
 
 # ==========================================================
 # 📊 FUNÇÃO PRINCIPAL — GERA RELATÓRIO DE ANÁLISE EXPLORATÓRIA
 # ==========================================================
-def gerar_relatorio_eda(df):
+def gerar_relatorio_eda(df, perfil=None):
 
     st.header("📊 Relatório Automático de Análise Exploratória (Auto-EDA)")
 
+    # Estatísticas calculadas uma única vez e compartilhadas com as outras páginas
+    # (ou um perfil aproximado vindo de estatisticas_streaming, sem o df em memória)
+    if perfil is None:
+        perfil = obter_perfil(df)
+
+    if perfil.get("aproximado"):
+        st.info(
+            f"📐 Relatório calculado por blocos: distintos ±{perfil['erros']['nunique_relativo']:.1%}, "
+            "quantis e histogramas a partir de sketches."
+        )
+
     # ==========================================================
     # 1) Informações gerais
     # ==========================================================
     st.subheader("📌 Informações Gerais do Dataset")
-    st.write(f"**Número de linhas:** {df.shape[0]}")
-    st.write(f"**Número de colunas:** {df.shape[1]}")
+    st.write(f"**Número de linhas:** {perfil['linhas']}")
+    st.write(f"**Número de colunas:** {perfil['colunas']}")
     st.write("**Prévia dos dados:**")
-    st.dataframe(df.head())
+    st.dataframe(perfil["previa"] if "previa" in perfil else df.head())
 
     # ==========================================================
     # 2) Tipos das variáveis
     # ==========================================================
     st.subheader("🧬 Tipos de Dados")
-    tipos = pd.DataFrame(df.dtypes, columns=["Tipo"])
+    tipos = pd.DataFrame(perfil["dtypes"].astype(str), columns=["Tipo"])
     st.dataframe(tipos)
 
     # ==========================================================
     # 3) Valores ausentes
     # ==========================================================
     st.subheader("⚠ Valores Ausentes")
-    faltantes = df.isna().sum()
+    faltantes = perfil["faltantes"]
     st.write(faltantes)
 
-    # Gráfico dos faltantes
+    # Gráfico dos faltantes (só colunas com ausentes, as piores primeiro)
     if faltantes.sum() > 0:
         fig, ax = plt.subplots(figsize=(8, 4))
-        faltantes.plot(kind='bar', ax=ax)
+        faltantes[faltantes > 0].sort_values(ascending=False).head(MAX_COLUNAS_FALTANTES).plot(kind='bar', ax=ax)
         ax.set_title("Valores Ausentes por Coluna")
-        st.pyplot(fig)
+        mostrar_figura(fig)
 
     # ==========================================================
     # 4) Estatísticas descritivas
     # ==========================================================
     st.subheader("📈 Estatísticas Descritivas (Numéricas)")
-    st.dataframe(df.describe(include='number'))
+    st.dataframe(perfil["describe_num"])
 
     st.subheader("📚 Estatísticas (Categorias)")
-    st.dataframe(df.describe(include='object'))
+    st.dataframe(perfil["describe_cat"])
 
     # ==========================================================
     # 5) Distribuição de variáveis numéricas
     # ==========================================================
     st.subheader("📊 Distribuição das Variáveis Numéricas")
 
-    for col in df.select_dtypes(include=['int64', 'float64']).columns:
-        fig, ax = plt.subplots()
-        sns.histplot(df[col].dropna(), kde=True, ax=ax)
-        ax.set_title(f"Distribuição de {col}")
-        st.pyplot(fig)
+    # Histograma + KDE a partir de bins pré-agregados; só a página visível é calculada
+    chave_dados = perfil.get("fingerprint") or (fingerprint_df(df) if df is not None else None)
+    desenhar_histogramas(df, perfil, paginar(perfil["numericas"], "eda_pagina_num"), chave_dados)
 
     # ==========================================================
     # 6) Distribuição de variáveis categóricas
     # ==========================================================
     st.subheader("🏷 Distribuição das Variáveis Categóricas")
 
-    for col in df.select_dtypes(include=['object']).columns:
-        fig, ax = plt.subplots()
-        df[col].value_counts().head(20).plot(kind='bar', ax=ax)
-        ax.set_title(f"Frequência das Categorias — {col}")
-        st.pyplot(fig)
+    desenhar_contagens(perfil, paginar(perfil["categoricas"], "eda_pagina_cat"))
 
     # ==========================================================
     # 7) Correlação entre variáveis numéricas
     # ==========================================================
     st.subheader("🔗 Correlação Entre Variáveis Numéricas")
 
-    num_df = df.select_dtypes(include=['int64', 'float64'])
+    if len(perfil["numericas"]) > 1 and len(perfil["corr"]) > 1:
+        # Matriz já recortada nas colunas dos pares mais fortes e agrupada por cluster
+        corr = perfil["corr"]
 
-    if num_df.shape[1] > 1:
-        corr = num_df.corr()
+        if len(corr) < len(perfil["numericas"]):
+            st.caption(f"Mostrando {len(corr)} de {len(perfil['numericas'])} colunas numéricas (as dos pares mais fortes).")
 
         fig, ax = plt.subplots(figsize=(8, 5))
-        sns.heatmap(corr, annot=True, cmap='Blues', ax=ax)
+        sns.heatmap(corr, annot=len(corr) <= 15, cmap='Blues', ax=ax)
         ax.set_title("Mapa de Correlação")
-        st.pyplot(fig)
+        mostrar_figura(fig)
+
+        st.write("**Pares mais correlacionados:**")
+        st.dataframe(perfil["pares_corr"].head(20))
     else:
         st.info("Poucas variáveis numéricas para gerar mapa de correlação.")
 
@@ -0,0 +1,188 @@
+import os
+import time
+
+import numpy as np
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from threadpoolctl import threadpool_limits
+
+from ensemble_adaptativo import crescer_ensemble
+from fila_tarefas import verificar_cancelamento
+from preprocessamento import entrada_para
+
+
+# ==========================================================
+# ⚙ Execução paralela dos modelos candidatos
+# ==========================================================
+def dividir_nucleos(n_candidatos, n_jobs=None):
+    # Orçamento total de núcleos → (candidatos em paralelo, núcleos por candidato)
+    total = n_jobs if n_jobs and n_jobs > 0 else (os.cpu_count() or 1)
+    paralelos = max(1, min(n_candidatos, total))
+    por_candidato = max(1, total // paralelos)
+
+    return paralelos, por_candidato
+
+
+# n_jobs sem efeito (e com FutureWarning a cada fit) a partir do sklearn 1.8
+_VERSAO_SKLEARN = tuple(int(p) for p in sklearn.__version__.split(".")[:2] if p.isdigit())
+N_JOBS_OBSOLETO = (LogisticRegression,) if _VERSAO_SKLEARN >= (1, 8) else ()
+
+
+def _dono_do_parametro(modelo, params, chave):
+    # "model__n_jobs" pertence ao passo "model" do Pipeline
+    return params[chave.rsplit("__", 1)[0]] if "__" in chave else modelo
+
+
+def limitar_n_jobs(modelo, nucleos):
+    # Vale para estimadores soltos e para Pipelines (ex.: "model__n_jobs")
+    todos = modelo.get_params()
+    params = {
+        chave: nucleos for chave in todos
+        if chave.endswith("n_jobs") and not isinstance(_dono_do_parametro(modelo, todos, chave), N_JOBS_OBSOLETO)
+    }
+    if params:
+        modelo.set_params(**params)
+
+    return modelo
+
+
+def ajustar_modelo(modelo, X, y, adaptativo=False):
+    # Modo adaptativo: ensembles crescem em incrementos até o score estabilizar
+    if adaptativo:
+        return crescer_ensemble(modelo, X, y)
+
+    return modelo.fit(X, y)
+
+
+def _ajustar_candidato(nome, modelo, X_train, y_train, X_test, y_test, metrica, nucleos, adaptativo=False):
+    inicio = time.perf_counter()
+
+    # BLAS/OpenMP também respeitam a fatia de núcleos deste candidato
+    with threadpool_limits(limits=nucleos):
+        limitar_n_jobs(modelo, nucleos)
+        ajustar_modelo(modelo, entrada_para(modelo, X_train), y_train, adaptativo)
+        preds = modelo.predict(entrada_para(modelo, X_test))
+
+    score = metrica(y_test, preds)
+    segundos = time.perf_counter() - inicio
+
+    return nome, modelo, score, segundos
+
+
+def do_candidato(X, nome):
+    # Matriz única compartilhada ou {nome: matriz} (ex.: encoding nativo por modelo)
+    return X[nome] if isinstance(X, dict) else X
+
+
+def treinar_candidatos(candidatos, X_train, y_train, X_test, y_test, metrica, n_jobs=None, adaptativo=False):
+    paralelos, por_candidato = dividir_nucleos(len(candidatos), n_jobs)
+
+    # Processos (loky): cada candidato treina isolado, sem disputar o GIL
+    tarefas = (
+        delayed(_ajustar_candidato)(
+            nome, modelo, do_candidato(X_train, nome), y_train, do_candidato(X_test, nome), y_test,
+            metrica, por_candidato, adaptativo
+        )
+        for nome, modelo in candidatos.items()
+    )
+
+    # Gerador: entre um candidato e outro a tarefa de fundo pode ser cancelada
+    avaliados = []
+    for avaliado in Parallel(n_jobs=paralelos, backend="loky", return_as="generator")(tarefas):
+        verificar_cancelamento()
+        avaliados.append(avaliado)
+
+    return avaliados
+
+
+# ==========================================================
+# ⏱ Successive halving com orçamento de tempo
+# ==========================================================
+def _linhas(X, indices):
+    if isinstance(X, dict):
+        return {nome: _linhas(matriz, indices) for nome, matriz in X.items()}
+
+    return X.iloc[indices] if hasattr(X, "iloc") else X[indices]
+
+
+def selecionar_por_halving(
+    candidatos, X_train, y_train, X_test, y_test, metrica, maior_melhor=True,
+    orcamento_segundos=None, eta=3, min_linhas=200, n_jobs=None, adaptativo=False, seed=42
+):
+    inicio = time.perf_counter()
+    n = len(y_train)
+
+    # Frações crescentes (…, 1/9, 1/3, 1) começando perto de min_linhas: rodadas
+    # suficientes para eliminar candidatos e para o orçamento poder parar cedo
+    rodadas = 1
+    while eta ** (rodadas - 1) < len(candidatos) or n / eta ** (rodadas - 1) > min_linhas * eta:
+        rodadas += 1
+    fracoes = [max(1 / eta ** (rodadas - 1 - r), min(1.0, min_linhas / max(n, 1))) for r in range(rodadas)]
+
+    # Permutação fixa: a amostra de cada rodada contém a da rodada anterior
+    ordem = np.random.default_rng(seed).permutation(n)
+
+    vivos = dict(candidatos)
+    historico = []
+    avaliados = []
+    duracao_rodada = None
+    linhas_rodada = 0
+
+    for rodada, fracao in enumerate(fracoes):
+        decorrido = time.perf_counter() - inicio
+
+        # Dataset pequeno: frações repetidas não trariam informação nova
+        if rodada > 0 and fracao == fracoes[rodada - 1]:
+            break
+
+        if orcamento_segundos is not None and avaliados:
+            # Próxima rodada custa ~eta vezes mais linhas para ~1/eta dos candidatos
+            estimativa = duracao_rodada * eta * len(vivos) / max(len(avaliados), 1)
+            if decorrido + estimativa > orcamento_segundos:
+                break
+
+        indices = np.sort(ordem[: max(int(round(fracao * n)), 1)])
+        linhas_rodada = len(indices)
+        inicio_rodada = time.perf_counter()
+
+        avaliados = treinar_candidatos(
+            {nome: clone(modelo) for nome, modelo in vivos.items()},
+            _linhas(X_train, indices), _linhas(y_train, indices), X_test, y_test, metrica,
+            n_jobs=n_jobs, adaptativo=adaptativo
+        )
+        duracao_rodada = time.perf_counter() - inicio_rodada
+
+        for nome, _, score, segundos in avaliados:
+            historico.append({
+                "rodada": rodada,
+                "fracao": round(fracao, 4),
+                "linhas": len(indices),
+                "modelo": nome,
+                "score": float(score),
+                "segundos": round(segundos, 3),
+            })
+
+        # Promover só os melhores 1/eta para a próxima fração
+        ordenados = sorted(avaliados, key=lambda r: r[2], reverse=maior_melhor)
+        vivos = {nome: candidatos[nome] for nome, _, _, _ in ordenados[: max(1, int(np.ceil(len(ordenados) / eta)))]}
+
+    # Orçamento parou antes da fração 1: os promovidos são reajustados no treino
+    # inteiro (fora do orçamento) — nunca devolver um modelo visto só numa amostra
+    if linhas_rodada < n:
+        avaliados = treinar_candidatos(
+            {nome: clone(modelo) for nome, modelo in vivos.items()},
+            X_train, y_train, X_test, y_test, metrica, n_jobs=n_jobs, adaptativo=adaptativo
+        )
+        for nome, _, score, segundos in avaliados:
+            historico.append({
+                "rodada": "final",
+                "fracao": 1.0,
+                "linhas": n,
+                "modelo": nome,
+                "score": float(score),
+                "segundos": round(segundos, 3),
+            })
+
+    return avaliados, historico
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# ==========================================================
+# 🗄 Cache LRU do pipeline upload → limpeza
+# ==========================================================
+# Fica no nível do módulo: o Streamlit reexecuta só o script principal a cada
+# interação, então este estado sobrevive às reruns (e é compartilhado entre sessões).
+LIMITE_CACHE_MB = 2048
+MAX_ENTRADAS = 8
+TAMANHO_BLOCO_HASH = 8 * 1024 * 1024
+
+_cache = OrderedDict()
+_trava = threading.Lock()
+_estatisticas = {"acertos": 0, "falhas": 0, "descartes": 0}
+
+
+def chave_conteudo(arquivo, configuracao=None):
+    # Hash do conteúdo (não do nome): reenviar o mesmo arquivo reaproveita o resultado
+    h = hashlib.blake2b(digest_size=20)
+
+    arquivo.seek(0)
+    while True:
+        bloco = arquivo.read(TAMANHO_BLOCO_HASH)
+        if not bloco:
+            break
+        h.update(bloco)
+    arquivo.seek(0)
+
+    h.update(json.dumps(configuracao or {}, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _tamanho_bytes(valor):
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+
+    if isinstance(valor, (tuple, list)):
+        return sum(_tamanho_bytes(v) for v in valor)
+
+    return 0
+
+
+def _memoria_total():
+    return sum(tamanho for _, tamanho in _cache.values())
+
+
+def obter_ou_calcular(chave, funcao, limite_mb=LIMITE_CACHE_MB, max_entradas=MAX_ENTRADAS):
+    with _trava:
+        if chave in _cache:
+            _cache.move_to_end(chave)
+            _estatisticas["acertos"] += 1
+            return _cache[chave][0]
+
+        _estatisticas["falhas"] += 1
+
+    valor = funcao()
+    tamanho = _tamanho_bytes(valor)
+
+    with _trava:
+        # Resultado maior que o cache inteiro → devolver sem guardar
+        if tamanho > limite_mb * 1024 * 1024:
+            return valor
+
+        _cache[chave] = (valor, tamanho)
+        _cache.move_to_end(chave)
+
+        # Descartar os menos usados até caber no limite
+        while len(_cache) > max_entradas or _memoria_total() > limite_mb * 1024 * 1024:
+            _cache.popitem(last=False)
+            _estatisticas["descartes"] += 1
+
+    return valor
+
+
+def estatisticas_cache():
+    with _trava:
+        total = _estatisticas["acertos"] + _estatisticas["falhas"]
+        return {
+            **_estatisticas,
+            "entradas": len(_cache),
+            "memoria_mb": round(_memoria_total() / (1024 * 1024), 2),
+            "taxa_acerto": round(_estatisticas["acertos"] / total, 4) if total else 0.0,
+        }
+
+
+def limpar_cache():
+    with _trava:
+        _cache.clear()
@@ -0,0 +1,181 @@
+from collections import OrderedDict
+
+from sklearn.ensemble import (
+    GradientBoostingClassifier,
+    GradientBoostingRegressor,
+    HistGradientBoostingClassifier,
+    HistGradientBoostingRegressor,
+    RandomForestClassifier,
+    RandomForestRegressor,
+)
+from sklearn.linear_model import LinearRegression, LogisticRegression, Ridge, SGDClassifier, SGDRegressor
+from sklearn.naive_bayes import BernoulliNB
+from sklearn.neural_network import MLPClassifier, MLPRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from preprocessamento import construir_preprocessador, n_categoricas_nativas
+
+
+# ==========================================================
+# 🗂 Catálogo plugável de modelos candidatos
+# ==========================================================
+# Cada entrada: fábrica (recebe o X bruto), faixa de tamanho em que vale a pena
+# e o tipo de entrada esperada ("esparsa" = encoding padrão, "nativa" =
+# categóricas como códigos ordinais para o boosting por histograma).
+ENTRADA_ESPARSA = "esparsa"
+ENTRADA_NATIVA = "nativa"
+
+LINHAS_GRANDE = 100_000
+
+_registro = {
+    "classificacao": OrderedDict(),
+    "regressao": OrderedDict(),
+    # Modelos com partial_fit, usados no treino fora da memória
+    "classificacao_incremental": OrderedDict(),
+    "regressao_incremental": OrderedDict(),
+}
+
+
+def registrar_modelo(
+    tarefa, nome, fabrica, min_linhas=0, max_linhas=None, max_colunas=None, entrada=ENTRADA_ESPARSA
+):
+    _registro[tarefa][nome] = {
+        "fabrica": fabrica,
+        "min_linhas": min_linhas,
+        "max_linhas": max_linhas,
+        "max_colunas": max_colunas,
+        "entrada": entrada,
+    }
+
+
+def remover_modelo(tarefa, nome):
+    _registro[tarefa].pop(nome, None)
+
+
+def _cabe(item, n_linhas, n_colunas):
+    if n_linhas < item["min_linhas"]:
+        return False
+    if item["max_linhas"] is not None and n_linhas > item["max_linhas"]:
+        return False
+    if item["max_colunas"] is not None and n_colunas > item["max_colunas"]:
+        return False
+    return True
+
+
+def selecionar_modelos(tarefa, X):
+    n_linhas, n_colunas = X.shape
+
+    catalogo = {
+        nome: {"modelo": item["fabrica"](X), "entrada": item["entrada"]}
+        for nome, item in _registro[tarefa].items()
+        if _cabe(item, n_linhas, n_colunas)
+    }
+
+    # Nenhum candidato na faixa → catálogo completo, para nunca ficar sem modelo
+    if not catalogo:
+        catalogo = {
+            nome: {"modelo": item["fabrica"](X), "entrada": item["entrada"]}
+            for nome, item in _registro[tarefa].items()
+        }
+
+    return catalogo
+
+
+def preprocessadores_por_modelo(catalogo, X):
+    # Um preprocessador por tipo de entrada, compartilhado pelos modelos do mesmo tipo
+    por_entrada = {
+        entrada: construir_preprocessador(X, nativo=entrada == ENTRADA_NATIVA)
+        for entrada in {item["entrada"] for item in catalogo.values()}
+    }
+
+    return {nome: por_entrada[item["entrada"]] for nome, item in catalogo.items()}
+
+
+def _categoricas_nativas(X):
+    # O preprocessador nativo coloca as categóricas codificadas nas primeiras colunas
+    k = n_categoricas_nativas(X)
+    return list(range(k)) if k else None
+
+
+# ==========================================================
+# 📋 Candidatos padrão
+# ==========================================================
+# Classificação
+registrar_modelo(
+    "classificacao", "RandomForest",
+    lambda X: RandomForestClassifier(n_estimators=200, random_state=42),
+    max_linhas=2 * LINHAS_GRANDE,
+)
+registrar_modelo(
+    "classificacao", "LogisticRegression",
+    lambda X: LogisticRegression(max_iter=1000),
+    max_linhas=LINHAS_GRANDE,
+)
+registrar_modelo(
+    "classificacao", "SGDLogistico",
+    lambda X: make_pipeline(
+        StandardScaler(with_mean=False),
+        SGDClassifier(loss="log_loss", early_stopping=True, random_state=42),
+    ),
+    min_linhas=LINHAS_GRANDE,
+)
+registrar_modelo(
+    "classificacao", "GradientBoosting",
+    lambda X: GradientBoostingClassifier(),
+    max_linhas=LINHAS_GRANDE // 2, max_colunas=200,
+)
+registrar_modelo(
+    "classificacao", "HistGradientBoosting",
+    lambda X: HistGradientBoostingClassifier(categorical_features=_categoricas_nativas(X), random_state=42),
+    entrada=ENTRADA_NATIVA,
+)
+
+# Regressão
+registrar_modelo(
+    "regressao", "RandomForestRegressor",
+    lambda X: RandomForestRegressor(n_estimators=300, random_state=42),
+    max_linhas=2 * LINHAS_GRANDE,
+)
+registrar_modelo(
+    "regressao", "GradientBoostingRegressor",
+    lambda X: GradientBoostingRegressor(),
+    max_linhas=LINHAS_GRANDE // 2, max_colunas=200,
+)
+registrar_modelo(
+    "regressao", "LinearRegression",
+    lambda X: LinearRegression(),
+    max_linhas=LINHAS_GRANDE,
+)
+registrar_modelo(
+    "regressao", "Ridge",
+    lambda X: Ridge(solver="sparse_cg"),
+    min_linhas=LINHAS_GRANDE,
+)
+registrar_modelo(
+    "regressao", "HistGradientBoostingRegressor",
+    lambda X: HistGradientBoostingRegressor(categorical_features=_categoricas_nativas(X), random_state=42),
+    entrada=ENTRADA_NATIVA,
+)
+
+# Incrementais (partial_fit por bloco; escala já feita no preprocessamento)
+registrar_modelo(
+    "classificacao_incremental", "SGDClassifier",
+    lambda X: SGDClassifier(loss="log_loss", random_state=42),
+)
+registrar_modelo(
+    "classificacao_incremental", "BernoulliNB",
+    lambda X: BernoulliNB(),
+)
+registrar_modelo(
+    "classificacao_incremental", "MLPClassifier",
+    lambda X: MLPClassifier(hidden_layer_sizes=(64,), batch_size=256, random_state=42),
+)
+registrar_modelo(
+    "regressao_incremental", "SGDRegressor",
+    lambda X: SGDRegressor(random_state=42),
+)
+registrar_modelo(
+    "regressao_incremental", "MLPRegressor",
+    lambda X: MLPRegressor(hidden_layer_sizes=(64,), batch_size=256, random_state=42),
+)
@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+from fila_tarefas import verificar_cancelamento
+
+
+# ==========================================================
+# 🔗 Correlações — pares fortes / top-k sem loop Python por par
+# ==========================================================
+TAMANHO_BLOCO = 256
+MAX_COLUNAS_HEATMAP = 30
+
+
+def _bloco_sem_nan(za, zb, n):
+    return za.T @ zb / (n - 1)
+
+
+def _bloco_com_nan(xa, ma, xb, mb):
+    # Igual ao pandas.corr: cada par usa só as linhas onde os dois existem
+    n = ma.T @ mb
+    sa = xa.T @ mb
+    sb = ma.T @ xb
+    saa = (xa ** 2).T @ mb
+    sbb = ma.T @ (xb ** 2)
+    sab = xa.T @ xb
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sab - sa * sb / n
+        return cov / np.sqrt((saa - sa ** 2 / n) * (sbb - sb ** 2 / n))
+
+
+def _melhores(i, j, r, top_k):
+    if top_k is None or len(r) <= top_k:
+        return i, j, r
+
+    sel = np.argpartition(-np.abs(r), top_k - 1)[:top_k]
+    return i[sel], j[sel], r[sel]
+
+
+def pares_correlacionados(df, limiar=None, top_k=None, tamanho_bloco=TAMANHO_BLOCO, amostra_linhas=None, seed=42):
+    colunas = list(df.columns)
+    vazio = pd.DataFrame({"coluna_a": [], "coluna_b": [], "correlacao": []})
+
+    if len(colunas) < 2 or len(df) < 2:
+        return vazio
+
+    if amostra_linhas is not None and len(df) > amostra_linhas:
+        df = df.sample(n=amostra_linhas, random_state=seed)
+
+    x = df.to_numpy(dtype=np.float64)
+    presente = ~np.isnan(x)
+    tem_nan = not presente.all()
+
+    # Centralizar pela média da coluna reduz o erro numérico das somas
+    contagem = presente.sum(axis=0)
+    x = x - np.nansum(x, axis=0) / np.maximum(contagem, 1)
+
+    if tem_nan:
+        x = np.nan_to_num(x)
+        m = presente.astype(np.float64)
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = x / x.std(axis=0, ddof=1)
+
+    n, p = x.shape
+    achados_i, achados_j, achados_r = [], [], []
+
+    # Blocos de colunas: memória O(bloco²) mesmo com milhares de colunas
+    for ini_a in range(0, p, tamanho_bloco):
+        verificar_cancelamento()
+        fim_a = min(ini_a + tamanho_bloco, p)
+
+        for ini_b in range(ini_a, p, tamanho_bloco):
+            fim_b = min(ini_b + tamanho_bloco, p)
+
+            if tem_nan:
+                bloco = _bloco_com_nan(x[:, ini_a:fim_a], m[:, ini_a:fim_a], x[:, ini_b:fim_b], m[:, ini_b:fim_b])
+            else:
+                bloco = _bloco_sem_nan(x[:, ini_a:fim_a], x[:, ini_b:fim_b], n)
+
+            # Só o triângulo superior (i < j) de cada par de colunas
+            ii, jj = np.indices(bloco.shape)
+            ii, jj = ii + ini_a, jj + ini_b
+            valido = (ii < jj) & ~np.isnan(bloco)
+
+            if limiar is not None:
+                valido &= np.abs(bloco) >= limiar
+
+            i, j, r = _melhores(ii[valido], jj[valido], np.clip(bloco[valido], -1, 1), top_k)
+            achados_i.append(i)
+            achados_j.append(j)
+            achados_r.append(r)
+
+            # Manter o acumulado limitado a top_k entre blocos
+            if top_k is not None:
+                i, j, r = _melhores(np.concatenate(achados_i), np.concatenate(achados_j), np.concatenate(achados_r), top_k)
+                achados_i, achados_j, achados_r = [i], [j], [r]
+
+    i, j, r = np.concatenate(achados_i), np.concatenate(achados_j), np.concatenate(achados_r)
+    if len(r) == 0:
+        return vazio
+
+    ordem = np.argsort(-np.abs(r), kind="stable")
+    return pd.DataFrame({
+        "coluna_a": [colunas[k] for k in i[ordem]],
+        "coluna_b": [colunas[k] for k in j[ordem]],
+        "correlacao": r[ordem],
+    })
+
+
+def pares_de_matriz(corr, limiar=None, top_k=None):
+    # Mesmo resultado de pares_correlacionados a partir de uma matriz já pronta
+    valores = corr.to_numpy(dtype=np.float64)
+    i, j = np.triu_indices(len(valores), k=1)
+    r = valores[i, j]
+
+    valido = ~np.isnan(r)
+    if limiar is not None:
+        valido &= np.abs(r) >= limiar
+
+    i, j, r = _melhores(i[valido], j[valido], r[valido], top_k)
+    ordem = np.argsort(-np.abs(r), kind="stable")
+    colunas = list(corr.columns)
+
+    return pd.DataFrame({
+        "coluna_a": [colunas[k] for k in i[ordem]],
+        "coluna_b": [colunas[k] for k in j[ordem]],
+        "correlacao": r[ordem],
+    })
+
+
+# ==========================================================
+# 🔥 Heatmap — truncado nas colunas mais relevantes e agrupado
+# ==========================================================
+def ordenar_por_cluster(corr):
+    if len(corr) < 3:
+        return corr
+
+    try:
+        from scipy.cluster.hierarchy import leaves_list, linkage
+        from scipy.spatial.distance import squareform
+    except ImportError:
+        return corr
+
+    distancia = 1 - np.abs(np.nan_to_num(corr.to_numpy(dtype=np.float64)))
+    np.fill_diagonal(distancia, 0)
+    distancia = (distancia + distancia.T) / 2
+
+    ordem = leaves_list(linkage(squareform(np.clip(distancia, 0, None), checks=False), method="average"))
+    return corr.iloc[ordem, ordem]
+
+
+def colunas_para_heatmap(pares, todas_colunas, max_colunas=MAX_COLUNAS_HEATMAP):
+    if len(todas_colunas) <= max_colunas:
+        return list(todas_colunas)
+
+    # Colunas que aparecem nos pares mais fortes, na ordem em que aparecem
+    envolvidas = pd.unique(pares[["coluna_a", "coluna_b"]].to_numpy().ravel())
+    return list(envolvidas[:max_colunas])
+
+
+def matriz_heatmap(df, pares, max_colunas=MAX_COLUNAS_HEATMAP, amostra_linhas=None):
+    colunas = colunas_para_heatmap(pares, df.columns, max_colunas)
+    if len(colunas) < 2:
+        return pd.DataFrame()
+
+    dados = df[colunas]
+    if amostra_linhas is not None and len(dados) > amostra_linhas:
+        dados = dados.sample(n=amostra_linhas, random_state=42)
+
+    return ordenar_por_cluster(dados.corr())
+
+
+def recortar_matriz(corr, pares, max_colunas=MAX_COLUNAS_HEATMAP):
+    # Para quando a matriz completa já existe (ex.: perfil por blocos)
+    colunas = colunas_para_heatmap(pares, corr.columns, max_colunas)
+    if len(colunas) < 2:
+        return pd.DataFrame()
+
+    return ordenar_por_cluster(corr.loc[colunas, colunas])
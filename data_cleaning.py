@@ -1,75 +1,276 @@
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
-import re
+from pandas.tseries.api import guess_datetime_format
+
+try:
+    import pyarrow
+except ImportError:  # opcional
+    pyarrow = None
+
+PADRAO_ASPAS = r"[\"']"
+PADRAO_ESPACOS = r"\s+"
+TOKENS_NULOS = [""]
+VERSAO_ESQUEMA = 1
 
-def limpar_celulas(df):
 
-    df = df.copy()
-    
-    for col in df.columns:
-        if df[col].dtype == "object":
+# ==========================================================
+# 🔧 Cabeçalho
+# ==========================================================
+def _limpar_nome_coluna(col):
+    if not isinstance(col, str):
+        col = str(col)
 
-            # 1) Remover aspas
-            df[col] = df[col].astype(str).str.replace('"', '', regex=False)
-            df[col] = df[col].astype(str).str.replace("'", '', regex=False)
+    col = (
+        col.replace('"', '')
+           .replace("'", "")
+           .strip()
+           .replace(" ", "_")
+           .replace("\n", "")
+           .replace("\t", "")
+    )
 
-            # 2) Remover espaços
-            df[col] = df[col].str.strip()
+    if col == "" or col.lower().startswith("unnamed"):
+        col = None
 
-            # 3) Converter strings vazias em NaN
-            df[col] = df[col].replace("", np.nan)
+    return col
 
-            # 4) Remover duplicação de espaços
-            df[col] = df[col].apply(lambda x: re.sub(r'\s+', ' ', x) if isinstance(x, str) else x)
+
+def limpar_header(df, retornar_mapa=False):
+    mapa = {str(col): _limpar_nome_coluna(col) for col in df.columns}
+    colunas_corrigidas = [_limpar_nome_coluna(col) for col in df.columns]
+
+    df = df.copy(deep=False)
+    df.columns = colunas_corrigidas
+    df = df.loc[:, df.columns.notnull()]
+
+    if retornar_mapa:
+        return df, mapa
 
     return df
 
 
-def ajustar_tipos(df):
+# ==========================================================
+# 🧽 Células de texto
+# ==========================================================
 
-    df = df.copy()
 
-    for col in df.columns:
-        serie = df[col]
+def _eh_coluna_texto(serie):
+    return serie.dtype == "object" or isinstance(serie.dtype, pd.StringDtype)
+
 
-        # TENTAR converter números — mas só quando fizer sentido
-        try:
-            # Se mais de 80% são números, converte
-            pct_num = pd.to_numeric(serie, errors="coerce").notna().mean()
+def _limpar_serie(serie, usar_arrow=False, tokens_nulos=TOKENS_NULOS):
+    # Trabalhar só com os valores distintos: em colunas de texto repetitivas
+    # isso reduz milhões de linhas a poucos milhares de strings
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
 
-            if pct_num > 0.8:
-                df[col] = pd.to_numeric(serie, errors="coerce")
-                continue
+    # Com pyarrow, as regex rodam nos kernels do Arrow (fora do GIL); sem ele,
+    # nos objetos Python
+    limpos = pd.Series(unicos, dtype=object).astype(str)
+    if pyarrow is not None:
+        limpos = limpos.astype("string[pyarrow]")
 
-        except:
-            pass
+    limpos = (
+        limpos
+        .str.replace(PADRAO_ASPAS, "", regex=True)
+        .str.replace(PADRAO_ESPACOS, " ", regex=True)
+        .str.strip()
+    )
+    limpos = limpos.where(~limpos.isin(tokens_nulos))
 
-        # TENTAR converter datas — mas só quando fizer sentido
-        try:
-            pct_date = pd.to_datetime(serie, errors="coerce").notna().mean()
+    # Código -1 (NaN original) aponta para o NaN extra no fim → NaN continua NaN
+    valores = np.append(limpos.to_numpy(dtype=object, na_value=np.nan), np.nan)[codigos]
 
-            if pct_date > 0.8:
-                df[col] = pd.to_datetime(serie, errors="coerce")
-                continue
+    if usar_arrow:
+        dtype = "string[pyarrow]"
+    elif isinstance(serie.dtype, pd.StringDtype):
+        dtype = serie.dtype
+    else:
+        dtype = object
 
-        except:
-            pass
+    return pd.Series(valores, index=serie.index, name=serie.name, dtype=dtype)
 
-        # Caso contrário → mantém como texto
+
+def limpar_celulas(df, usar_arrow=False, n_jobs=None, tokens_nulos=TOKENS_NULOS):
+
+    # Cópia rasa: as colunas limpas substituem as originais sem duplicar o resto
+    df = df.copy(deep=False)
+
+    colunas = [col for col in df.columns if _eh_coluna_texto(df[col])]
+    if not colunas:
+        return df
+
+    n_jobs = n_jobs or min(len(colunas), os.cpu_count() or 1)
+
+    # Colunas são independentes; threads só ajudam quando as regex rodam no
+    # Arrow (liberam o GIL) — com .str em objetos Python o trabalho é serial
+    if pyarrow is not None and n_jobs > 1 and len(colunas) > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            limpas = list(executor.map(lambda col: _limpar_serie(df[col], usar_arrow, tokens_nulos), colunas))
+    else:
+        limpas = [_limpar_serie(df[col], usar_arrow, tokens_nulos) for col in colunas]
+
+    for col, serie in zip(colunas, limpas):
         df[col] = serie
 
     return df
 
 
-def autofix_csv(df):
+# ==========================================================
+# 🧬 Tipos
+# ==========================================================
+LIMIAR_CONVERSAO = 0.8
+TAMANHO_AMOSTRA_TIPOS = 5000
+FORMATOS_DATA = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    # ISO-8601 com fração de segundo e/ou fuso ("Z" ou ±hh:mm)
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S.%f%z",
+    "%Y-%m-%d %H:%M:%S%z",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%d/%m/%Y",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y %H:%M:%S",
+    "%d-%m-%Y",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+]
+
+
+def _amostra_estratificada(serie, tamanho, estratos=10, seed=42):
+    valores = serie.dropna()
+
+    if len(valores) <= tamanho:
+        return valores
+
+    # Sortear a mesma quantidade em cada faixa do arquivo (início, meio, fim...)
+    # para não decidir o tipo só pelas primeiras linhas
+    rng = np.random.default_rng(seed)
+    limites = np.linspace(0, len(valores), estratos + 1, dtype=int)
+    por_estrato = tamanho // estratos
+
+    posicoes = np.concatenate([
+        rng.choice(np.arange(ini, fim), size=min(por_estrato, fim - ini), replace=False)
+        for ini, fim in zip(limites[:-1], limites[1:])
+    ])
+    posicoes.sort()
+
+    return valores.iloc[posicoes]
+
+
+def _fracao_data(amostra, formato):
+    return float(pd.to_datetime(amostra, format=formato, errors="coerce").notna().mean())
+
+
+def _detectar_formato_data(amostra):
+    melhor_formato, melhor_pct = None, 0.0
+
+    # Lista ordenada primeiro: o primeiro formato que cobre a amostra inteira vence
+    for formato in FORMATOS_DATA:
+        pct = _fracao_data(amostra, formato)
+        if pct > melhor_pct:
+            melhor_formato, melhor_pct = formato, pct
+        if pct == 1.0:
+            return melhor_formato, melhor_pct
+
+    # Formatos adivinhados pelo pandas a partir de alguns valores. dayfirst só
+    # quando o valor não começa pelo ano: em "2023-01-02..." ele trocaria mês e dia
+    adivinhados = set()
+    for valor in amostra.astype(str).head(5):
+        formato = guess_datetime_format(valor, dayfirst=not re.match(r"\d{4}", valor))
+        if formato and formato not in FORMATOS_DATA:
+            adivinhados.add(formato)
+
+    # Só aceito se cobrir a amostra inteira e nenhum outro palpite cobrir também
+    # (dois formatos que leem tudo = ambiguidade dia/mês); senão fica a lista
+    completos = [formato for formato in sorted(adivinhados) if _fracao_data(amostra, formato) == 1.0]
+    if len(completos) == 1:
+        return completos[0], 1.0
+
+    return melhor_formato, melhor_pct
+
+
+def inferir_tipo_coluna(serie, tamanho_amostra=TAMANHO_AMOSTRA_TIPOS):
+
+    if pd.api.types.is_numeric_dtype(serie):
+        return {"tipo": "numerico", "formato": None, "confianca": 1.0}
+
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return {"tipo": "data", "formato": None, "confianca": 1.0}
+
+    amostra = _amostra_estratificada(serie, tamanho_amostra)
+
+    if amostra.empty:
+        return {"tipo": "texto", "formato": None, "confianca": 0.0}
+
+    # TENTAR números — só quando a grande maioria da amostra for numérica
+    pct_num = float(pd.to_numeric(amostra, errors="coerce").notna().mean())
+
+    if pct_num > LIMIAR_CONVERSAO:
+        return {"tipo": "numerico", "formato": None, "confianca": round(pct_num, 4)}
+
+    # TENTAR datas — com formato explícito, detectado uma única vez
+    formato, pct_data = _detectar_formato_data(amostra)
+
+    if pct_data > LIMIAR_CONVERSAO:
+        return {"tipo": "data", "formato": formato, "confianca": round(pct_data, 4)}
+
+    # Caso contrário → texto; confiança = fração que não parece número nem data
+    return {"tipo": "texto", "formato": None, "confianca": round(1 - max(pct_num, pct_data), 4)}
+
+
+def inferir_tipos(df, tamanho_amostra=TAMANHO_AMOSTRA_TIPOS):
+    return {col: inferir_tipo_coluna(df[col], tamanho_amostra) for col in df.columns}
+
+
+def converter_coluna(serie, decisao):
+    if decisao["tipo"] == "numerico" and not pd.api.types.is_numeric_dtype(serie):
+        return pd.to_numeric(serie, errors="coerce")
+
+    if decisao["tipo"] == "data" and not pd.api.types.is_datetime64_any_dtype(serie):
+        return pd.to_datetime(serie, format=decisao["formato"], errors="coerce")
+
+    return serie
+
+
+def ajustar_tipos(df, decisoes=None, retornar_decisoes=False):
+
+    df = df.copy(deep=False)
+
+    if decisoes is None:
+        decisoes = inferir_tipos(df)
+
+    # Uma única conversão por coluna, já com o tipo (e formato) decididos
+    for col, decisao in decisoes.items():
+        if col in df.columns:
+            df[col] = converter_coluna(df[col], decisao)
+
+    if retornar_decisoes:
+        return df, decisoes
+
+    return df
+
+
+# ==========================================================
+# 🧩 Pipeline completo + esquema reaproveitável
+# ==========================================================
+def autofix_csv(df, usar_arrow=False, tokens_nulos=TOKENS_NULOS, retornar_esquema=False):
 
-    df = df.copy()
+    # Etapa 0: cabeçalho (idempotente — pode já ter sido limpo antes)
+    df, mapa_header = limpar_header(df, retornar_mapa=True)
 
     # Etapa 1: limpeza textual
-    df = limpar_celulas(df)
+    df = limpar_celulas(df, usar_arrow=usar_arrow, tokens_nulos=tokens_nulos)
 
     # Etapa 2: conversões automáticas somente quando seguras
-    df = ajustar_tipos(df)
+    df, decisoes = ajustar_tipos(df, retornar_decisoes=True)
 
     # Relatório simples
     relatorio = [
@@ -78,5 +279,61 @@ def autofix_csv(df):
         "Valores vazios padronizados como NaN"
     ]
 
+    for col, decisao in decisoes.items():
+        formato = f" ({decisao['formato']})" if decisao["formato"] else ""
+        relatorio.append(f"{col}: {decisao['tipo']}{formato} — confiança {decisao['confianca']:.0%}")
+
+    if retornar_esquema:
+        esquema = {
+            "versao": VERSAO_ESQUEMA,
+            "header": mapa_header,
+            "colunas": list(df.columns),
+            "tipos": decisoes,
+            "tokens_nulos": list(tokens_nulos),
+            "usar_arrow": usar_arrow,
+        }
+        return df, relatorio, esquema
+
     return df, relatorio
 
+
+def aplicar_esquema(df, esquema):
+
+    # Etapa 0: cabeçalho — mapa salvo; colunas novas recebem a mesma regra
+    mapa = esquema["header"]
+    df = df.copy(deep=False)
+    df.columns = [mapa.get(str(col), _limpar_nome_coluna(col)) for col in df.columns]
+    df = df.loc[:, df.columns.notnull()]
+
+    # Mesmas colunas, na mesma ordem, em todo lote (faltantes viram NaN)
+    df = df.reindex(columns=esquema["colunas"])
+
+    # Etapa 1: limpeza textual com os mesmos tokens nulos
+    df = limpar_celulas(df, usar_arrow=esquema["usar_arrow"], tokens_nulos=esquema["tokens_nulos"])
+
+    # Etapa 2: tipos já decididos — nenhuma inferência
+    for col, decisao in esquema["tipos"].items():
+        serie = df[col]
+
+        if decisao["tipo"] == "texto" and not _eh_coluna_texto(serie):
+            # Ex.: lote em que uma coluna de texto veio só com dígitos
+            df[col] = serie.astype(object).where(serie.isna(), serie.astype(str))
+        else:
+            df[col] = converter_coluna(serie, decisao)
+
+    return df
+
+
+def salvar_esquema(esquema, caminho):
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(esquema, f, ensure_ascii=False, indent=2)
+
+
+def carregar_esquema(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        esquema = json.load(f)
+
+    if esquema.get("versao") != VERSAO_ESQUEMA:
+        raise ValueError(f"Versão de esquema não suportada: {esquema.get('versao')}")
+
+    return esquema
@@ -0,0 +1,103 @@
+import numpy as np
+from sklearn.ensemble import (
+    ExtraTreesClassifier, ExtraTreesRegressor, GradientBoostingClassifier, GradientBoostingRegressor,
+    RandomForestClassifier, RandomForestRegressor,
+)
+from sklearn.model_selection import train_test_split
+
+from fila_tarefas import verificar_cancelamento
+
+
+# ==========================================================
+# 🌲 Ensembles que crescem até o score estabilizar
+# ==========================================================
+INCREMENTO = 50
+MAX_ESTIMADORES = 1000
+PACIENCIA = 2
+TOLERANCIA = 1e-3
+FRACAO_VALIDACAO = 0.1
+
+
+def crescer_ensemble(
+    modelo, X, y, incremento=INCREMENTO, max_estimadores=MAX_ESTIMADORES,
+    paciencia=PACIENCIA, tolerancia=TOLERANCIA, fracao_validacao=FRACAO_VALIDACAO, seed=42
+):
+    params = modelo.get_params()
+
+    # Modelos sem warm start (ex.: LogisticRegression) → fit normal
+    if "warm_start" not in params or "n_estimators" not in params:
+        return modelo.fit(X, y)
+
+    # Gradient boosting já tem parada antecipada nativa na validação interna
+    if isinstance(modelo, (GradientBoostingClassifier, GradientBoostingRegressor)):
+        modelo.set_params(
+            n_estimators=max_estimadores,
+            n_iter_no_change=paciencia * 5,
+            validation_fraction=fracao_validacao,
+            tol=tolerancia,
+        )
+        modelo.fit(X, y)
+        modelo.historico_crescimento_ = [(int(modelo.n_estimators_), None)]
+        return modelo
+
+    # Florestas com bootstrap → score out-of-bag (sem separar dados);
+    # sem bootstrap → pequena validação separada do treino
+    usar_oob = params.get("bootstrap", False)
+
+    if usar_oob:
+        modelo.set_params(oob_score=True)
+        X_fit, y_fit = X, y
+    else:
+        X_fit, X_val, y_fit, y_val = train_test_split(X, y, test_size=fracao_validacao, random_state=seed)
+
+    modelo.set_params(warm_start=True, n_estimators=incremento)
+
+    melhor = -np.inf
+    sem_melhora = 0
+    historico = []
+
+    while True:
+        verificar_cancelamento()
+
+        # warm_start: só as árvores novas são treinadas a cada volta
+        modelo.fit(X_fit, y_fit)
+        score = modelo.oob_score_ if usar_oob else modelo.score(X_val, y_val)
+        historico.append((modelo.n_estimators, float(score)))
+
+        if score > melhor + tolerancia:
+            melhor = score
+            sem_melhora = 0
+        else:
+            sem_melhora += 1
+
+        if sem_melhora >= paciencia or modelo.n_estimators >= max_estimadores:
+            break
+
+        modelo.set_params(n_estimators=min(modelo.n_estimators + incremento, max_estimadores))
+
+    # Um fit futuro (ex.: clone + refit) deve começar do zero e com a
+    # configuração original (oob_score=True só valia para o crescimento)
+    modelo.set_params(warm_start=False)
+    if usar_oob:
+        modelo.set_params(oob_score=params["oob_score"])
+    modelo.historico_crescimento_ = historico
+
+    return modelo
+
+
+def ajustar_em_etapas(modelo, X, y, incremento=INCREMENTO):
+    # Floresta com número fixo de árvores, treinada de `incremento` em `incremento`:
+    # o warm_start sorteia as sementes na mesma sequência, então o modelo é o
+    # mesmo de um fit único, mas a tarefa de fundo pode ser cancelada no meio
+    florestas = (RandomForestClassifier, RandomForestRegressor, ExtraTreesClassifier, ExtraTreesRegressor)
+    if not isinstance(modelo, florestas):
+        return modelo.fit(X, y)
+
+    total = modelo.n_estimators
+    for n in range(min(incremento, total), total + incremento, incremento):
+        verificar_cancelamento()
+        modelo.set_params(warm_start=True, n_estimators=min(n, total))
+        modelo.fit(X, y)
+
+    modelo.set_params(warm_start=False)
+    return modelo
@@ -0,0 +1,404 @@
+import numpy as np
+import pandas as pd
+
+from correlacao import pares_de_matriz, recortar_matriz
+from data_cleaning import aplicar_esquema, autofix_csv
+from leitura_csv import ler_csv_em_blocos
+
+
+# ==========================================================
+# 🌊 Estatísticas mescláveis por bloco (datasets maiores que a memória)
+# ==========================================================
+# Cada bloco gera um "resumo" pequeno; resumos de blocos diferentes (ou de
+# processos diferentes) são combinados sem voltar aos dados originais.
+TIPOS_NUMERICOS = ("int64", "float64")
+K_QUANTIS = 512
+P_HLL = 14
+K_TOPK = 1000
+TOP_PARES_CORR = 100
+LINHAS_PREVIA = 5
+
+_rng = np.random.default_rng(42)
+
+
+def _eh_coluna_texto(serie):
+    return serie.dtype == "object" or isinstance(serie.dtype, pd.StringDtype)
+
+
+# ----------------------------------------------------------
+# Momentos (Welford / Chan) — média, variância, min, max
+# ----------------------------------------------------------
+def _momentos_bloco(valores):
+    if len(valores) == 0:
+        return {"n": 0, "media": 0.0, "m2": 0.0, "min": np.nan, "max": np.nan}
+
+    media = float(valores.mean())
+    return {
+        "n": int(len(valores)),
+        "media": media,
+        "m2": float(((valores - media) ** 2).sum()),
+        "min": float(valores.min()),
+        "max": float(valores.max()),
+    }
+
+
+def _combinar_momentos(a, b):
+    if a["n"] == 0:
+        return dict(b)
+    if b["n"] == 0:
+        return dict(a)
+
+    n = a["n"] + b["n"]
+    delta = b["media"] - a["media"]
+
+    return {
+        "n": n,
+        "media": a["media"] + delta * b["n"] / n,
+        "m2": a["m2"] + b["m2"] + delta ** 2 * a["n"] * b["n"] / n,
+        "min": min(a["min"], b["min"]),
+        "max": max(a["max"], b["max"]),
+    }
+
+
+# ----------------------------------------------------------
+# Quantis aproximados (sketch de compactadores, estilo KLL)
+# ----------------------------------------------------------
+def _quantis_novo(k=K_QUANTIS):
+    # niveis[h] guarda itens com peso 2**h; "erro" é o pior caso absoluto de rank
+    return {"k": k, "niveis": [np.empty(0)], "n": 0, "erro": 0.0}
+
+
+def _quantis_compactar(sk):
+    h = 0
+    while h < len(sk["niveis"]):
+        buf = sk["niveis"][h]
+
+        if len(buf) > sk["k"]:
+            buf = np.sort(buf)
+            sobra = buf[-1:] if len(buf) % 2 else buf[:0]
+            pares = buf[: len(buf) - len(sobra)]
+
+            # Metade dos itens sobe de nível com peso dobrado
+            promovidos = pares[_rng.integers(2)::2]
+            sk["niveis"][h] = sobra
+            if h + 1 == len(sk["niveis"]):
+                sk["niveis"].append(np.empty(0))
+            sk["niveis"][h + 1] = np.concatenate([sk["niveis"][h + 1], promovidos])
+            sk["erro"] += 2.0 ** h
+
+        h += 1
+
+
+def _quantis_adicionar(sk, valores):
+    sk["niveis"][0] = np.concatenate([sk["niveis"][0], valores])
+    sk["n"] += len(valores)
+    _quantis_compactar(sk)
+
+
+def _combinar_quantis(a, b):
+    niveis = [
+        np.concatenate([
+            a["niveis"][h] if h < len(a["niveis"]) else np.empty(0),
+            b["niveis"][h] if h < len(b["niveis"]) else np.empty(0),
+        ])
+        for h in range(max(len(a["niveis"]), len(b["niveis"])))
+    ]
+    sk = {"k": a["k"], "niveis": niveis, "n": a["n"] + b["n"], "erro": a["erro"] + b["erro"]}
+    _quantis_compactar(sk)
+    return sk
+
+
+def itens_ponderados(sk):
+    itens = np.concatenate(sk["niveis"])
+    pesos = np.concatenate([np.full(len(nivel), 2.0 ** h) for h, nivel in enumerate(sk["niveis"])])
+    return itens, pesos
+
+
+def estimar_quantis(sk, qs):
+    itens, pesos = itens_ponderados(sk)
+    if len(itens) == 0:
+        return [np.nan for _ in qs]
+
+    ordem = np.argsort(itens)
+    itens, acumulado = itens[ordem], np.cumsum(pesos[ordem])
+    posicoes = np.searchsorted(acumulado, np.asarray(qs) * acumulado[-1], side="left")
+
+    return list(itens[np.minimum(posicoes, len(itens) - 1)])
+
+
+# ----------------------------------------------------------
+# Distintos aproximados (HyperLogLog)
+# ----------------------------------------------------------
+def _hll_novo():
+    return np.zeros(1 << P_HLL, dtype=np.uint8)
+
+
+def _hll_adicionar(registros, hashes):
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    if len(hashes) == 0:
+        return
+
+    indices = (hashes >> np.uint64(64 - P_HLL)).astype(np.intp)
+
+    # 32 bits seguintes → posição do primeiro bit 1 (exato em float64)
+    janela = ((hashes >> np.uint64(32 - P_HLL)) & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    rho = np.where(janela > 0, 32 - np.floor(np.log2(np.maximum(janela, 1))), 33).astype(np.uint8)
+
+    np.maximum.at(registros, indices, rho)
+
+
+def estimar_distintos(registros):
+    m = len(registros)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimativa = alpha * m * m / np.sum(np.power(2.0, -registros.astype(np.float64)))
+
+    zeros = int(np.count_nonzero(registros == 0))
+    if estimativa <= 2.5 * m and zeros > 0:
+        # Faixa pequena → contagem linear é mais precisa
+        estimativa = m * np.log(m / zeros)
+
+    return float(estimativa)
+
+
+def _hashes(obj):
+    return pd.util.hash_pandas_object(obj, index=False).to_numpy()
+
+
+# ----------------------------------------------------------
+# Itens mais frequentes (Misra-Gries mesclável)
+# ----------------------------------------------------------
+def _topk_reduzir(contagens, k):
+    # Mantém k contadores; o que foi descontado é o limite de erro por item
+    if len(contagens) <= k:
+        return contagens, 0
+
+    contagens = contagens.sort_values(ascending=False)
+    corte = contagens.iloc[k]
+    contagens = contagens.iloc[:k] - corte
+
+    return contagens[contagens > 0], int(corte)
+
+
+def _topk_bloco(serie, k=K_TOPK):
+    contagens, corte = _topk_reduzir(serie.value_counts(), k)
+    return {"k": k, "contagens": contagens, "decremento": corte}
+
+
+def _combinar_topk(a, b):
+    contagens = a["contagens"].add(b["contagens"], fill_value=0)
+    contagens, corte = _topk_reduzir(contagens, a["k"])
+    return {"k": a["k"], "contagens": contagens, "decremento": a["decremento"] + b["decremento"] + corte}
+
+
+# ----------------------------------------------------------
+# Covariância por pares (somas deslocadas, mescláveis)
+# ----------------------------------------------------------
+def _cov_bloco(matriz, desloc):
+    x = matriz - desloc
+    presente = (~np.isnan(x)).astype(np.float64)
+    x0 = np.nan_to_num(x)
+
+    # [i, j] considera só as linhas onde i e j estão presentes (igual ao pandas.corr)
+    return {
+        "desloc": desloc,
+        "n": presente.T @ presente,
+        "sx": x0.T @ presente,
+        "sxx": (x0 ** 2).T @ presente,
+        "sxy": x0.T @ x0,
+    }
+
+
+def _cov_reposicionar(cov, desloc):
+    d = cov["desloc"] - desloc
+    di, dj = d[:, None], d[None, :]
+
+    return {
+        "desloc": desloc,
+        "n": cov["n"],
+        "sx": cov["sx"] + di * cov["n"],
+        "sxx": cov["sxx"] + 2 * di * cov["sx"] + di ** 2 * cov["n"],
+        "sxy": cov["sxy"] + dj * cov["sx"] + di * cov["sx"].T + di * dj * cov["n"],
+    }
+
+
+def _combinar_cov(a, b):
+    b = _cov_reposicionar(b, a["desloc"])
+    return {
+        "desloc": a["desloc"],
+        **{chave: a[chave] + b[chave] for chave in ("n", "sx", "sxx", "sxy")},
+    }
+
+
+def correlacao_de_cov(cov, colunas):
+    n = cov["n"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        c = cov["sxy"] - cov["sx"] * cov["sx"].T / n
+        var_i = cov["sxx"] - cov["sx"] ** 2 / n
+        corr = c / np.sqrt(var_i * var_i.T)
+
+    return pd.DataFrame(corr, index=colunas, columns=colunas)
+
+
+# ==========================================================
+# 🧮 Resumo de um bloco e combinação de resumos
+# ==========================================================
+def resumir_bloco(df, numericas=None, categoricas=None):
+    if numericas is None:
+        numericas = [col for col in df.columns if str(df[col].dtype) in TIPOS_NUMERICOS]
+    if categoricas is None:
+        categoricas = [col for col in df.columns if _eh_coluna_texto(df[col])]
+
+    resumo = {
+        "linhas": len(df),
+        "colunas": list(df.columns),
+        "dtypes": {col: str(df[col].dtype) for col in df.columns},
+        "numericas": list(numericas),
+        "categoricas": list(categoricas),
+        "faltantes": {col: int(df[col].isna().sum()) for col in df.columns},
+        "momentos": {},
+        "quantis": {},
+        "hll": {},
+        "topk": {},
+        "previa": df.head(LINHAS_PREVIA),
+    }
+
+    # Linhas inteiras → estimativa de duplicadas
+    resumo["hll_linhas"] = _hll_novo()
+    _hll_adicionar(resumo["hll_linhas"], _hashes(df))
+
+    for col in df.columns:
+        serie = df[col].dropna()
+
+        resumo["hll"][col] = _hll_novo()
+        _hll_adicionar(resumo["hll"][col], _hashes(serie))
+
+        if col in numericas:
+            valores = pd.to_numeric(serie, errors="coerce").dropna().to_numpy(dtype=np.float64)
+            resumo["momentos"][col] = _momentos_bloco(valores)
+            resumo["quantis"][col] = _quantis_novo()
+            _quantis_adicionar(resumo["quantis"][col], valores)
+
+        elif col in categoricas:
+            resumo["topk"][col] = _topk_bloco(serie)
+
+    if len(numericas) > 1:
+        matriz = df[numericas].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        desloc = np.nan_to_num(np.nanmean(matriz, axis=0)) if len(matriz) else np.zeros(len(numericas))
+        resumo["cov"] = _cov_bloco(matriz, desloc)
+
+    return resumo
+
+
+def combinar_resumos(a, b):
+    return {
+        "linhas": a["linhas"] + b["linhas"],
+        "colunas": a["colunas"],
+        "dtypes": a["dtypes"],
+        "numericas": a["numericas"],
+        "categoricas": a["categoricas"],
+        "faltantes": {col: a["faltantes"][col] + b["faltantes"].get(col, 0) for col in a["colunas"]},
+        "momentos": {col: _combinar_momentos(m, b["momentos"][col]) for col, m in a["momentos"].items()},
+        "quantis": {col: _combinar_quantis(q, b["quantis"][col]) for col, q in a["quantis"].items()},
+        "hll": {col: np.maximum(h, b["hll"][col]) for col, h in a["hll"].items()},
+        "hll_linhas": np.maximum(a["hll_linhas"], b["hll_linhas"]),
+        "topk": {col: _combinar_topk(t, b["topk"][col]) for col, t in a["topk"].items()},
+        **({"cov": _combinar_cov(a["cov"], b["cov"])} if "cov" in a else {}),
+        "previa": a["previa"],
+    }
+
+
+# ==========================================================
+# 🧾 Resumo → perfil (mesmo formato de perfil_dados.calcular_perfil)
+# ==========================================================
+def resumo_para_perfil(resumo):
+    linhas = resumo["linhas"]
+    colunas = resumo["colunas"]
+    numericas = resumo["numericas"]
+    categoricas = resumo["categoricas"]
+
+    nunique = pd.Series(
+        {col: int(round(estimar_distintos(resumo["hll"][col]))) for col in colunas}, dtype="int64"
+    )
+    erro_hll = 1.04 / np.sqrt(1 << P_HLL)
+
+    describe_num = {}
+    for col in numericas:
+        m, sk = resumo["momentos"][col], resumo["quantis"][col]
+        q25, q50, q75 = estimar_quantis(sk, [0.25, 0.5, 0.75])
+        describe_num[col] = {
+            "count": m["n"],
+            "mean": m["media"] if m["n"] else np.nan,
+            "std": np.sqrt(m["m2"] / (m["n"] - 1)) if m["n"] > 1 else np.nan,
+            "min": m["min"],
+            "25%": q25,
+            "50%": q50,
+            "75%": q75,
+            "max": m["max"],
+        }
+
+    contagens = {col: resumo["topk"][col]["contagens"].sort_values(ascending=False) for col in categoricas}
+    describe_cat = {
+        col: {
+            "count": linhas - resumo["faltantes"][col],
+            "unique": nunique[col],
+            "top": contagens[col].index[0] if len(contagens[col]) else np.nan,
+            "freq": contagens[col].iloc[0] if len(contagens[col]) else np.nan,
+        }
+        for col in categoricas
+    }
+
+    # Duplicadas = linhas − linhas distintas; só reportar acima de 3 desvios do HLL
+    duplicadas_est = max(0.0, linhas - estimar_distintos(resumo["hll_linhas"]))
+    limite_dup = 3 * erro_hll * linhas
+    duplicadas = int(round(duplicadas_est)) if duplicadas_est > limite_dup else 0
+
+    corr = correlacao_de_cov(resumo["cov"], numericas) if "cov" in resumo else pd.DataFrame()
+    pares_corr = pares_de_matriz(corr, top_k=TOP_PARES_CORR) if len(corr) else pares_de_matriz(pd.DataFrame())
+
+    return {
+        "linhas": linhas,
+        "colunas": len(colunas),
+        "dtypes": pd.Series(resumo["dtypes"], dtype=object),
+        "faltantes": pd.Series(resumo["faltantes"], dtype="int64"),
+        "nunique": nunique,
+        "numericas": numericas,
+        "categoricas": categoricas,
+        "describe_num": pd.DataFrame(describe_num, index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"]),
+        "describe_cat": pd.DataFrame(describe_cat, index=["count", "unique", "top", "freq"], dtype=object),
+        "contagens": contagens,
+        "pares_corr": pares_corr,
+        "corr": recortar_matriz(corr, pares_corr) if len(corr) else corr,
+        "duplicadas": duplicadas,
+        "previa": resumo["previa"],
+        "distribuicoes": {col: itens_ponderados(resumo["quantis"][col]) for col in numericas},
+        "aproximado": True,
+        "erros": {
+            "quantis_rank": {
+                col: resumo["quantis"][col]["erro"] / max(resumo["quantis"][col]["n"], 1) for col in numericas
+            },
+            "nunique_relativo": erro_hll,
+            "contagens_absoluto": {col: resumo["topk"][col]["decremento"] for col in categoricas},
+            "duplicadas_absoluto": limite_dup,
+        },
+    }
+
+
+def perfil_arquivo(fonte, esquema=None, linhas_por_bloco=200_000):
+    resumo = None
+
+    for bloco in ler_csv_em_blocos(fonte, linhas_por_bloco):
+        if esquema is None:
+            # Primeiro bloco define a limpeza; os demais só aplicam o esquema
+            bloco, _, esquema = autofix_csv(bloco, retornar_esquema=True)
+        else:
+            bloco = aplicar_esquema(bloco, esquema)
+
+        if resumo is None:
+            resumo = resumir_bloco(bloco)
+        else:
+            resumo = combinar_resumos(resumo, resumir_bloco(bloco, resumo["numericas"], resumo["categoricas"]))
+
+    if resumo is None:
+        return None
+
+    return resumo_para_perfil(resumo)
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import shap
+from joblib import Parallel, delayed
+
+from busca_modelos import dividir_nucleos
+from fila_tarefas import verificar_cancelamento
+from perfil_dados import fingerprint_df
+
+
+# ==========================================================
+# 🌈 SHAP amostrado, em lotes paralelos e com cache
+# ==========================================================
+# Explicar algumas milhares de linhas já dá a importância global com boa
+# precisão; o resultado fica guardado por (modelo, dados) e não é recalculado
+# a cada rerun do Streamlit. O custo por linha varia ordens de grandeza
+# (linear: µs; floresta profunda com ~1000 features: ~1 s), então um lote
+# pequeno é cronometrado antes e a amostra é dimensionada pelo orçamento —
+# poucos segundos por padrão, para o SHAP não custar mais que o próprio treino.
+AMOSTRA_FUNDO = 100
+AMOSTRA_LINHAS = 2000
+LINHAS_POR_LOTE = 250
+LINHAS_CALIBRACAO = 10
+SEGUNDOS_POR_LOTE = 2.0
+ORCAMENTO_SEGUNDOS = 5
+MAX_EXPLICACOES = 8
+
+_explicacoes = OrderedDict()
+_trava = threading.Lock()
+
+
+def amostrar_linhas(X, n, seed=42):
+    total = X.shape[0]
+    if n is None or total <= n:
+        return X
+
+    indices = np.sort(np.random.default_rng(seed).choice(total, n, replace=False))
+    return X.iloc[indices] if hasattr(X, "iloc") else X[indices]
+
+
+def _denso(X):
+    return X.toarray() if sp.issparse(X) else X
+
+
+def _impressao_dados(X):
+    if isinstance(X, pd.DataFrame):
+        return fingerprint_df(X)
+
+    return joblib.hash((X.shape, X.toarray() if sp.issparse(X) else np.asarray(X)))
+
+
+def _criar_explainer(modelo, fundo):
+    # Árvores: algoritmo exato e rápido; lineares: fechado; resto: permutação no fundo
+    try:
+        return shap.TreeExplainer(modelo)
+    except Exception:
+        pass
+
+    try:
+        return shap.LinearExplainer(modelo, fundo)
+    except Exception:
+        pass
+
+    funcao = modelo.predict_proba if hasattr(modelo, "predict_proba") else modelo.predict
+    return shap.Explainer(lambda dados: funcao(dados), _denso(fundo))
+
+
+def _valores_lote(explainer, lote):
+    if isinstance(explainer, (shap.TreeExplainer, shap.LinearExplainer)):
+        # check_additivity recalcula o modelo inteiro; desnecessário para importância
+        if isinstance(explainer, shap.TreeExplainer):
+            return explainer.shap_values(_denso(lote), check_additivity=False)
+        return explainer.shap_values(lote)
+
+    return explainer(_denso(lote)).values
+
+
+def _juntar(partes):
+    # Multiclasse pode vir como lista (uma matriz por classe) → (linhas, features, classes)
+    if isinstance(partes[0], list):
+        partes = [np.stack(p, axis=-1) for p in partes]
+
+    return np.concatenate(partes, axis=0)
+
+
+def importancia_global(valores, nomes=None):
+    importancia = np.abs(valores).mean(axis=0)
+    if importancia.ndim > 1:
+        importancia = importancia.mean(axis=1)
+
+    nomes = nomes if nomes is not None else [f"f{i}" for i in range(len(importancia))]
+    return pd.Series(importancia, index=list(nomes)).sort_values(ascending=False)
+
+
+def explicar_modelo(
+    modelo, X, nomes=None, amostra_linhas=AMOSTRA_LINHAS, amostra_fundo=AMOSTRA_FUNDO,
+    linhas_por_lote=LINHAS_POR_LOTE, n_jobs=None, pasta=None, seed=42, orcamento_segundos=ORCAMENTO_SEGUNDOS
+):
+    linhas = amostrar_linhas(X, amostra_linhas, seed)
+    fundo = amostrar_linhas(X, amostra_fundo, seed + 1)
+
+    chave = joblib.hash((joblib.hash(modelo), _impressao_dados(linhas), amostra_fundo, orcamento_segundos))
+
+    with _trava:
+        if chave in _explicacoes:
+            _explicacoes.move_to_end(chave)
+            return _explicacoes[chave]
+
+    caminho = os.path.join(pasta, f"shap_{chave}.joblib") if pasta is not None else None
+    if caminho is not None and os.path.exists(caminho):
+        explicacao = joblib.load(caminho)
+    else:
+        inicio = time.perf_counter()
+        explainer = _criar_explainer(modelo, fundo)
+
+        # Calibração: as primeiras linhas da amostra, cronometradas, já entram no resultado
+        calibracao = min(LINHAS_CALIBRACAO, linhas.shape[0])
+        t0 = time.perf_counter()
+        partes = [_valores_lote(explainer, linhas[:calibracao])]
+        por_linha = (time.perf_counter() - t0) / max(calibracao, 1)
+
+        restantes = linhas.shape[0] - calibracao
+        paralelos, _ = dividir_nucleos(max(1, restantes // max(linhas_por_lote, 1)), n_jobs)
+
+        # Quantas linhas cabem no que sobra do orçamento, com os workers em paralelo;
+        # lotes de ~SEGUNDOS_POR_LOTE para o prazo poder ser conferido entre eles
+        if orcamento_segundos is not None and por_linha > 0:
+            sobra = orcamento_segundos - (time.perf_counter() - inicio)
+            restantes = max(0, min(restantes, int(sobra * paralelos / por_linha)))
+            linhas_por_lote = max(1, min(linhas_por_lote, int(SEGUNDOS_POR_LOTE / por_linha)))
+
+        lotes = [
+            linhas[i:i + linhas_por_lote]
+            for i in range(calibracao, calibracao + restantes, linhas_por_lote)
+        ]
+        if lotes:
+            # Um núcleo: no próprio processo (sem serializar o explainer a cada lote).
+            # Gerador: os lotes chegam em ordem e dá para parar entre eles
+            if paralelos == 1:
+                resultados = (_valores_lote(explainer, lote) for lote in lotes)
+            else:
+                resultados = Parallel(n_jobs=paralelos, backend="loky", return_as="generator")(
+                    delayed(_valores_lote)(explainer, lote) for lote in lotes
+                )
+
+            prazo = inicio + orcamento_segundos if orcamento_segundos is not None else None
+            anterior = time.perf_counter()
+            for parte in resultados:
+                verificar_cancelamento()
+                partes.append(parte)
+
+                # Se a calibração errou: o próximo lote, estimado pelo último medido,
+                # não começa quando terminaria depois do orçamento
+                agora = time.perf_counter()
+                if prazo is not None and agora + (agora - anterior) > prazo:
+                    break
+                anterior = agora
+
+        valores = _juntar(partes)
+        limitado = valores.shape[0] < linhas.shape[0]
+        linhas = linhas[:valores.shape[0]]
+        nomes = list(nomes) if nomes is not None else (
+            list(X.columns) if hasattr(X, "columns") else None
+        )
+
+        explicacao = {
+            "valores": valores,
+            "X": linhas,
+            "base": explainer.expected_value if hasattr(explainer, "expected_value") else None,
+            "nomes": nomes,
+            "importancia": importancia_global(valores, nomes),
+            "chave": chave,
+            "segundos_por_linha": por_linha,
+            "limitado_por_tempo": limitado,
+        }
+
+        if caminho is not None:
+            os.makedirs(pasta, exist_ok=True)
+            joblib.dump(explicacao, caminho)
+
+    with _trava:
+        _explicacoes[chave] = explicacao
+        while len(_explicacoes) > MAX_EXPLICACOES:
+            _explicacoes.popitem(last=False)
+
+    return explicacao
+
+
+def nomes_features(prep):
+    # Encoders sem nomes (ex.: hashing) → nomes genéricos
+    try:
+        return list(prep.get_feature_names_out())
+    except Exception:
+        return None
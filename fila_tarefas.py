@@ -0,0 +1,351 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import joblib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# ==========================================================
+# 🧵 Fila de tarefas em segundo plano (treino, SHAP, EDA)
+# ==========================================================
+# As tarefas rodam num pool de processos do módulo (sobrevive às reruns do
+# Streamlit); estado e resultado ficam em disco em tarefas/<id>.json e
+# tarefas/<id>.joblib, então outra sessão — ou a mesma depois de trocar de
+# página — encontra a tarefa pelo id e reaproveita o resultado. A pasta vem
+# de AUTOML_PASTA_TAREFAS; tarefas terminadas antigas são apagadas sozinhas.
+PASTA_TAREFAS = os.environ.get("AUTOML_PASTA_TAREFAS", "tarefas")
+MAX_PROCESSOS = 2
+RETENCAO_DIAS = 7
+MAX_TAREFAS_GUARDADAS = 200
+INTERVALO_LIMPEZA_SEGUNDOS = 300
+# <id>.vivo é renovado pelo processo do Streamlit que tem a tarefa no pool e
+# pelo worker que a executa; sem renovação por ABANDONO_SEGUNDOS a tarefa é
+# dada como interrompida
+BATIMENTO_SEGUNDOS = 2
+ABANDONO_SEGUNDOS = 15
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+FALHOU = "falhou"
+CANCELADA = "cancelada"
+INTERROMPIDA = "interrompida"
+
+_pool = None
+_futuros = {}
+_vivas = {}
+_trava = threading.RLock()
+_ultima_limpeza = {}
+
+# Tarefa em execução neste processo (lado do worker)
+_atual = {"id": None, "pasta": None}
+
+
+# BaseException (como KeyboardInterrupt): os `except Exception` que tornam
+# etapas opcionais (SHAP, LIME) não podem engolir um cancelamento
+class TarefaCancelada(BaseException):
+    pass
+
+
+def _caminho(pasta, id_tarefa, extensao):
+    return os.path.join(pasta, f"{id_tarefa}.{extensao}")
+
+
+def _ler_estado(pasta, id_tarefa):
+    try:
+        with open(_caminho(pasta, id_tarefa, "json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+@contextmanager
+def _travado(pasta, id_tarefa):
+    # Trava entre processos (worker, vários servidores do Streamlit) em volta do
+    # ler-alterar-gravar; o sistema a libera se o processo morrer no meio
+    if fcntl is None:
+        yield
+        return
+
+    with open(_caminho(pasta, id_tarefa, "trava"), "a") as arquivo:
+        fcntl.flock(arquivo, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+def _gravar_estado(pasta, id_tarefa, somente_se=None, **campos):
+    with _travado(pasta, id_tarefa):
+        estado = _ler_estado(pasta, id_tarefa) or {"id": id_tarefa}
+
+        # Transição condicional (ex.: só interrompe o que ainda está em andamento)
+        if somente_se is not None and estado.get("estado") not in somente_se:
+            return estado
+
+        estado.update(campos)
+
+        # Gravação atômica: quem lê nunca vê um JSON pela metade
+        temporario = _caminho(pasta, id_tarefa, f"{uuid.uuid4().hex}.tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(estado, f, ensure_ascii=False, default=str)
+        os.replace(temporario, _caminho(pasta, id_tarefa, "json"))
+
+    return estado
+
+
+def _cancelamento_pedido(pasta, id_tarefa):
+    return os.path.exists(_caminho(pasta, id_tarefa, "cancelar"))
+
+
+def _tocar(caminho):
+    with open(caminho, "a"):
+        pass
+    os.utime(caminho)
+
+
+def _bater_tarefa(pasta, id_tarefa, parar):
+    while not parar.wait(BATIMENTO_SEGUNDOS):
+        try:
+            _tocar(_caminho(pasta, id_tarefa, "vivo"))
+        except OSError:
+            pass
+
+
+# ----------------------------------------------------------
+# Lado do worker
+# ----------------------------------------------------------
+def verificar_cancelamento():
+    # Cancelamento cooperativo: chamado nos laços longos (árvores, lotes de SHAP,
+    # colunas) e a cada ponto de progresso. Fora de uma tarefa não faz nada.
+    if _atual["id"] is not None and _cancelamento_pedido(_atual["pasta"], _atual["id"]):
+        raise TarefaCancelada()
+
+
+def progresso(fracao, mensagem=""):
+    if _atual["id"] is None:
+        return
+
+    verificar_cancelamento()
+    _gravar_estado(_atual["pasta"], _atual["id"], progresso=round(float(fracao), 4), mensagem=mensagem)
+
+
+def _executar(id_tarefa, pasta, funcao, args, kwargs):
+    _atual.update(id=id_tarefa, pasta=pasta)
+
+    # O worker também bate: a tarefa continua viva mesmo se o processo do
+    # Streamlit que a submeteu cair (o resultado vai para o disco do mesmo jeito)
+    parar = threading.Event()
+    threading.Thread(target=_bater_tarefa, args=(pasta, id_tarefa, parar), daemon=True).start()
+
+    try:
+        if _cancelamento_pedido(pasta, id_tarefa):
+            raise TarefaCancelada()
+
+        _gravar_estado(pasta, id_tarefa, estado=EXECUTANDO, iniciado_em=time.time(), pid=os.getpid())
+
+        resultado = funcao(*args, **kwargs)
+        joblib.dump(resultado, _caminho(pasta, id_tarefa, "joblib"))
+
+        _gravar_estado(pasta, id_tarefa, estado=CONCLUIDA, progresso=1.0, terminado_em=time.time())
+    except TarefaCancelada:
+        _gravar_estado(pasta, id_tarefa, estado=CANCELADA, terminado_em=time.time())
+    except Exception as e:
+        _gravar_estado(
+            pasta, id_tarefa, estado=FALHOU, erro=f"{type(e).__name__}: {e}",
+            detalhes=traceback.format_exc(limit=5), terminado_em=time.time()
+        )
+    finally:
+        parar.set()
+        _atual.update(id=None, pasta=None)
+
+
+# ----------------------------------------------------------
+# Lado de quem submete (script do Streamlit)
+# ----------------------------------------------------------
+def _obter_pool():
+    global _pool
+
+    # spawn: o processo do Streamlit tem várias threads, fork não é seguro
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MAX_PROCESSOS, mp_context=multiprocessing.get_context("spawn"))
+        threading.Thread(target=_bater, daemon=True).start()
+
+    return _pool
+
+
+def _bater():
+    # Enquanto este processo tem a tarefa (na fila ou rodando), <id>.vivo é
+    # renovado; se o processo morrer, a renovação para junto
+    while True:
+        time.sleep(BATIMENTO_SEGUNDOS)
+        with _trava:
+            vivas = list(_vivas.items())
+        for id_tarefa, pasta in vivas:
+            try:
+                _tocar(_caminho(pasta, id_tarefa, "vivo"))
+            except OSError:
+                pass
+
+
+def _viva_em_algum_processo(pasta, id_tarefa):
+    with _trava:
+        futuro = _futuros.get(id_tarefa)
+    if futuro is not None and not futuro.done():
+        return True
+
+    # Futuro em outro processo do Streamlit (vários workers/servidores)
+    try:
+        return time.time() - os.path.getmtime(_caminho(pasta, id_tarefa, "vivo")) < ABANDONO_SEGUNDOS
+    except FileNotFoundError:
+        return False
+
+
+def _ao_terminar(pasta, id_tarefa, futuro):
+    with _trava:
+        _vivas.pop(id_tarefa, None)
+
+    # Falha fora de _executar (ex.: argumento que não serializa, worker morto)
+    if futuro.cancelled() or futuro.exception() is None:
+        return
+
+    _gravar_estado(pasta, id_tarefa, estado=FALHOU, erro=str(futuro.exception()), terminado_em=time.time())
+
+
+def estado_tarefa(id_tarefa, pasta=PASTA_TAREFAS):
+    estado = _ler_estado(pasta, id_tarefa)
+    if estado is None:
+        return None
+
+    # Pendente/executando sem nenhum processo renovando → sobra de um servidor
+    # reiniciado. Conferido de novo sob a trava para não sobrescrever um final.
+    if estado["estado"] in (PENDENTE, EXECUTANDO) and not _viva_em_algum_processo(pasta, id_tarefa):
+        estado = _gravar_estado(pasta, id_tarefa, somente_se=(PENDENTE, EXECUTANDO), estado=INTERROMPIDA)
+
+    return estado
+
+
+def id_tarefa_para(tipo, chave=None):
+    # Com chave (ex.: hash de dados + configuração), a mesma tarefa pedida de
+    # novo — por outra sessão ou numa rerun — cai no mesmo id
+    return f"{tipo}_{chave}" if chave else f"{tipo}_{uuid.uuid4().hex[:12]}"
+
+
+def em_andamento(estado):
+    return estado is not None and estado["estado"] in (PENDENTE, EXECUTANDO)
+
+
+def _remover_tarefa(pasta, id_tarefa):
+    for extensao in ("joblib", "cancelar", "vivo", "trava", "json"):
+        try:
+            os.remove(_caminho(pasta, id_tarefa, extensao))
+        except FileNotFoundError:
+            pass
+
+
+def limpar_tarefas(pasta=PASTA_TAREFAS, dias=RETENCAO_DIAS, maximo=MAX_TAREFAS_GUARDADAS):
+    # Só tarefas terminadas: as mais velhas que `dias` e as que passam de `maximo`
+    # (mantendo as mais recentes). Em andamento nunca são tocadas.
+    if not os.path.isdir(pasta):
+        return 0
+
+    estados = (_ler_estado(pasta, arquivo[:-5]) for arquivo in os.listdir(pasta) if arquivo.endswith(".json"))
+    terminadas = [
+        estado for estado in estados
+        if estado is not None and estado.get("estado") not in (PENDENTE, EXECUTANDO)
+    ]
+    terminadas.sort(key=lambda t: t.get("terminado_em") or t.get("criado_em") or 0, reverse=True)
+
+    limite = time.time() - dias * 86400
+    removidas = 0
+    for i, estado in enumerate(terminadas):
+        if i >= maximo or (estado.get("terminado_em") or estado.get("criado_em") or 0) < limite:
+            _remover_tarefa(pasta, estado["id"])
+            removidas += 1
+
+    return removidas
+
+
+def _limpar_de_tempos_em_tempos(pasta):
+    agora = time.monotonic()
+    with _trava:
+        if agora - _ultima_limpeza.get(pasta, -INTERVALO_LIMPEZA_SEGUNDOS) < INTERVALO_LIMPEZA_SEGUNDOS:
+            return
+        _ultima_limpeza[pasta] = agora
+
+    limpar_tarefas(pasta)
+
+
+def submeter(funcao, *args, tipo="tarefa", chave=None, descricao="", pasta=PASTA_TAREFAS, **kwargs):
+    id_tarefa = id_tarefa_para(tipo, chave)
+    os.makedirs(pasta, exist_ok=True)
+    _limpar_de_tempos_em_tempos(pasta)
+
+    with _trava:
+        atual = _ler_estado(pasta, id_tarefa)
+        if atual is not None:
+            if atual["estado"] == CONCLUIDA and os.path.exists(_caminho(pasta, id_tarefa, "joblib")):
+                return id_tarefa
+            if atual["estado"] in (PENDENTE, EXECUTANDO) and _viva_em_algum_processo(pasta, id_tarefa):
+                return id_tarefa
+
+        if os.path.exists(_caminho(pasta, id_tarefa, "cancelar")):
+            os.remove(_caminho(pasta, id_tarefa, "cancelar"))
+
+        _tocar(_caminho(pasta, id_tarefa, "vivo"))
+        _gravar_estado(
+            pasta, id_tarefa, tipo=tipo, descricao=descricao, estado=PENDENTE, progresso=0.0,
+            mensagem="", erro=None, criado_em=time.time(), iniciado_em=None, terminado_em=None
+        )
+        futuro = _obter_pool().submit(_executar, id_tarefa, pasta, funcao, args, kwargs)
+        _futuros[id_tarefa] = futuro
+        _vivas[id_tarefa] = pasta
+        futuro.add_done_callback(lambda f: _ao_terminar(pasta, id_tarefa, f))
+
+    return id_tarefa
+
+
+def cancelar(id_tarefa, pasta=PASTA_TAREFAS):
+    with _trava:
+        futuro = _futuros.get(id_tarefa)
+
+    # Ainda na fila → sai sem rodar; já rodando → para no próximo ponto de cancelamento
+    if futuro is not None and futuro.cancel():
+        _gravar_estado(pasta, id_tarefa, estado=CANCELADA, terminado_em=time.time())
+        return True
+
+    open(_caminho(pasta, id_tarefa, "cancelar"), "w").close()
+    return False
+
+
+def resultado_tarefa(id_tarefa, pasta=PASTA_TAREFAS):
+    estado = estado_tarefa(id_tarefa, pasta)
+    if estado is None or estado["estado"] != CONCLUIDA:
+        return None
+
+    return joblib.load(_caminho(pasta, id_tarefa, "joblib"))
+
+
+def listar_tarefas(tipo=None, pasta=PASTA_TAREFAS):
+    if not os.path.isdir(pasta):
+        return []
+
+    tarefas = [
+        estado_tarefa(arquivo[:-5], pasta)
+        for arquivo in os.listdir(pasta)
+        if arquivo.endswith(".json")
+    ]
+    tarefas = [t for t in tarefas if t is not None and (tipo is None or t.get("tipo") == tipo)]
+
+    return sorted(tarefas, key=lambda t: t.get("criado_em") or 0, reverse=True)
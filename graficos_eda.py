@@ -0,0 +1,173 @@
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import numpy as np
+import streamlit as st
+
+
+# ==========================================================
+# 🖼 Gráficos do Auto-EDA a partir de agregados
+# ==========================================================
+# Nada é desenhado linha a linha: cada coluna vira um histograma fino em NumPy
+# (uma passada, sem cópia nem ordenação) e o KDE sai do próprio histograma,
+# suavizado por convolução. Só as colunas da página visível são calculadas, e
+# cada página é uma única figura fechada logo depois de enviada ao navegador.
+BINS_HISTOGRAMA = 50
+SUBDIVISOES_KDE = 10
+COLUNAS_POR_PAGINA = 12
+GRAFICOS_POR_LINHA = 3
+TOP_CATEGORIAS = 20
+MAX_HISTOGRAMAS = 2000
+
+_histogramas = OrderedDict()
+_trava = threading.Lock()
+
+
+def _faixa(valores, minimo=None, maximo=None):
+    # min/max do perfil evitam mais uma passada sobre a coluna
+    if minimo is None or maximo is None or not np.isfinite([minimo, maximo]).all():
+        finitos = valores[np.isfinite(valores)]
+        if len(finitos) == 0:
+            return None
+        minimo, maximo = finitos.min(), finitos.max()
+
+    if minimo == maximo:
+        minimo, maximo = minimo - 0.5, maximo + 0.5
+
+    return float(minimo), float(maximo)
+
+
+def _kde_binado(finos, arestas):
+    total = finos.sum()
+    if total <= 0:
+        return np.zeros_like(finos, dtype=float)
+
+    centros = (arestas[:-1] + arestas[1:]) / 2
+    media = (finos * centros).sum() / total
+    desvio = np.sqrt((finos * (centros - media) ** 2).sum() / total)
+    if desvio == 0:
+        return finos.astype(float)
+
+    # Banda de Scott (a mesma do kde=True do seaborn), em número de bins finos
+    sigma = desvio * total ** (-1 / 5) / (arestas[1] - arestas[0])
+    raio = max(1, min(int(4 * sigma), len(finos) // 2 - 1))
+
+    nucleo = np.exp(-0.5 * (np.arange(-raio, raio + 1) / max(sigma, 1e-9)) ** 2)
+    return np.convolve(finos, nucleo / nucleo.sum(), mode="same")
+
+
+def agregar_histograma(valores, pesos=None, minimo=None, maximo=None, bins=BINS_HISTOGRAMA):
+    valores = np.asarray(valores)
+    if valores.dtype.kind not in "iuf":
+        valores = valores.astype(float)
+
+    faixa = _faixa(valores, minimo, maximo)
+    if faixa is None:
+        return None
+
+    # NaN e infinitos ficam fora da faixa e são ignorados pelo np.histogram
+    finos, arestas = np.histogram(valores, bins=bins * SUBDIVISOES_KDE, range=faixa, weights=pesos)
+
+    return {
+        "arestas": arestas[::SUBDIVISOES_KDE],
+        "contagens": finos.reshape(bins, SUBDIVISOES_KDE).sum(axis=1),
+        # Na escala das barras (contagem por bin exibido), como no seaborn
+        "x_kde": (arestas[:-1] + arestas[1:]) / 2,
+        "kde": _kde_binado(finos, arestas) * SUBDIVISOES_KDE,
+    }
+
+
+def histograma_coluna(df, perfil, col, chave_dados=None):
+    # Perfil aproximado (por blocos): o sketch de quantis já é uma amostra ponderada
+    if "distribuicoes" in perfil:
+        valores, pesos = perfil["distribuicoes"][col]
+        return agregar_histograma(valores, pesos)
+
+    chave = (chave_dados, col)
+    if chave_dados is not None:
+        with _trava:
+            if chave in _histogramas:
+                _histogramas.move_to_end(chave)
+                return _histogramas[chave]
+
+    resumo = perfil["describe_num"]
+    minimo, maximo = (resumo.at["min", col], resumo.at["max", col]) if col in resumo else (None, None)
+    hist = agregar_histograma(df[col].to_numpy(), minimo=minimo, maximo=maximo)
+
+    if chave_dados is not None:
+        with _trava:
+            _histogramas[chave] = hist
+            while len(_histogramas) > MAX_HISTOGRAMAS:
+                _histogramas.popitem(last=False)
+
+    return hist
+
+
+# ----------------------------------------------------------
+# Desenho
+# ----------------------------------------------------------
+def paginar(colunas, chave):
+    if len(colunas) <= COLUNAS_POR_PAGINA:
+        return colunas
+
+    paginas = -(-len(colunas) // COLUNAS_POR_PAGINA)
+    pagina = st.number_input(f"Página (1 a {paginas})", min_value=1, max_value=paginas, value=1, key=chave)
+
+    inicio = (int(pagina) - 1) * COLUNAS_POR_PAGINA
+    fim = min(inicio + COLUNAS_POR_PAGINA, len(colunas))
+    st.caption(f"Colunas {inicio + 1}–{fim} de {len(colunas)}")
+
+    return colunas[inicio:fim]
+
+
+def _grade(n):
+    linhas = -(-n // GRAFICOS_POR_LINHA)
+    fig, eixos = plt.subplots(
+        linhas, GRAFICOS_POR_LINHA, figsize=(4 * GRAFICOS_POR_LINHA, 3 * linhas), squeeze=False
+    )
+    for ax in eixos.flat[n:]:
+        ax.set_visible(False)
+
+    return fig, eixos.flat
+
+
+def mostrar_figura(fig):
+    # st.pyplot rasteriza na hora; fechar libera a figura do pyplot
+    fig.tight_layout()
+    st.pyplot(fig)
+    plt.close(fig)
+
+
+def desenhar_histogramas(df, perfil, colunas, chave_dados=None):
+    if not colunas:
+        return
+
+    fig, eixos = _grade(len(colunas))
+    for ax, col in zip(eixos, colunas):
+        hist = histograma_coluna(df, perfil, col, chave_dados)
+        ax.set_title(str(col), fontsize=10)
+
+        if hist is None:
+            ax.text(0.5, 0.5, "sem valores", ha="center", va="center", transform=ax.transAxes)
+            continue
+
+        ax.stairs(hist["contagens"], hist["arestas"], fill=True, alpha=0.5)
+        ax.plot(hist["x_kde"], hist["kde"], linewidth=1.5)
+
+    mostrar_figura(fig)
+
+
+def desenhar_contagens(perfil, colunas):
+    if not colunas:
+        return
+
+    fig, eixos = _grade(len(colunas))
+    for ax, col in zip(eixos, colunas):
+        contagens = perfil["contagens"][col].head(TOP_CATEGORIAS)
+        ax.bar(range(len(contagens)), contagens.to_numpy())
+        ax.set_xticks(range(len(contagens)))
+        ax.set_xticklabels([str(c)[:15] for c in contagens.index], rotation=90, fontsize=7)
+        ax.set_title(str(col), fontsize=10)
+
+    mostrar_figura(fig)
@@ -4,18 +4,25 @@
 import pandas as pd
 import numpy as np
 
-def gerar_insights(df):
+from perfil_dados import obter_perfil
+
+def gerar_insights(df, perfil=None):
     insights = []
 
+    # Estatísticas calculadas uma única vez e compartilhadas com as outras páginas
+    # (ou um perfil aproximado vindo de estatisticas_streaming, sem o df em memória)
+    if perfil is None:
+        perfil = obter_perfil(df)
+
     # ------------------------------------------------------
     # 1) Contagem básica
     # ------------------------------------------------------
-    insights.append(f"📌 O dataset possui **{df.shape[0]} linhas** e **{df.shape[1]} colunas**.")
+    insights.append(f"📌 O dataset possui **{perfil['linhas']} linhas** e **{perfil['colunas']} colunas**.")
 
     # ------------------------------------------------------
     # 2) Detectar colunas numéricas
     # ------------------------------------------------------
-    numericas = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
+    numericas = perfil["numericas"]
     if numericas:
         insights.append(f"🔢 Detectei **{len(numericas)} colunas numéricas**: {', '.join(numericas)}")
     else:
@@ -24,7 +31,7 @@ def gerar_insights(df):
     # ------------------------------------------------------
     # 3) Detectar colunas categóricas
     # ------------------------------------------------------
-    categ = df.select_dtypes(include=['object']).columns.tolist()
+    categ = perfil["categoricas"]
     if categ:
         insights.append(f"🏷 Existem **{len(categ)} colunas categóricas**: {', '.join(categ)}")
     else:
@@ -34,7 +41,7 @@ def gerar_insights(df):
     # 4) Detectar colunas com datas
     # ------------------------------------------------------
     datas = []
-    for col in df.columns:
+    for col in perfil["dtypes"].index:
         if "data" in col.lower() or "hora" in col.lower():
             datas.append(col)
 
@@ -44,7 +51,7 @@ def gerar_insights(df):
     # ------------------------------------------------------
     # 5) Missing values
     # ------------------------------------------------------
-    missing = df.isna().sum()
+    missing = perfil["faltantes"]
     total_missing = missing.sum()
     if total_missing > 0:
         insights.append(f"⚠ Existem **{total_missing} valores ausentes** no dataset.")
@@ -54,7 +61,7 @@ def gerar_insights(df):
     # ------------------------------------------------------
     # 6) Possível coluna alvo
     # ------------------------------------------------------
-    if "target" in df.columns:
+    if "target" in perfil["dtypes"].index:
         insights.append("🎯 Coluna alvo encontrada automaticamente: target")
 
     elif len(numericas) == 1:
@@ -67,12 +74,9 @@ def gerar_insights(df):
     # 7) Correlação forte (se houver mais de 1 numérica)
     # ------------------------------------------------------
     if len(numericas) > 1:
-        corr = df[numericas].corr()
-        pares = []
-        for i in range(len(numericas)):
-            for j in range(i+1, len(numericas)):
-                if abs(corr.iloc[i,j]) >= 0.6:
-                    pares.append((numericas[i], numericas[j], corr.iloc[i,j]))
+        fortes = perfil["pares_corr"]
+        fortes = fortes[fortes["correlacao"].abs() >= 0.6]
+        pares = list(fortes.itertuples(index=False, name=None))
 
         if pares:
             texto = "📈 Relações fortes detectadas:\n"
@@ -93,9 +97,20 @@ def gerar_insights(df):
     if len(categ) > 5:
         qualidade -= 10
 
-    if df.duplicated().sum() > 0:
+    if perfil["duplicadas"] > 0:
         qualidade -= 15
 
     insights.append(f"⭐ **Qualidade geral do dataset: {qualidade}/100**")
 
+    # ------------------------------------------------------
+    # 9) Margem de erro (perfil aproximado por blocos)
+    # ------------------------------------------------------
+    if perfil.get("aproximado"):
+        erros = perfil["erros"]
+        erro_quantis = max(erros["quantis_rank"].values(), default=0)
+        insights.append(
+            f"📐 Estatísticas aproximadas: distintos ±{erros['nunique_relativo']:.1%}, "
+            f"quantis ±{erro_quantis:.2%} de rank, duplicadas ±{erros['duplicadas_absoluto']:.0f} linhas."
+        )
+
     return insights
@@ -0,0 +1,246 @@
+import codecs
+import csv
+import re
+import time
+import warnings
+
+import pandas as pd
+
+
+TAMANHO_AMOSTRA = 64 * 1024
+DELIMITADORES = [",", ";", "\t", "|"]
+CODIFICACOES = ["utf-8-sig", "utf-8", "cp1252", "latin-1"]
+MAX_EXEMPLOS_DESCARTE = 5
+
+
+# ==========================================================
+# 🔎 Detecção de codificação e dialeto
+# ==========================================================
+def _abrir_binario(fonte):
+    # Aceita caminho no disco ou objeto tipo arquivo (ex.: UploadedFile do Streamlit)
+    if isinstance(fonte, (str, bytes)) or hasattr(fonte, "__fspath__"):
+        return open(fonte, "rb"), True
+
+    fonte.seek(0)
+    return fonte, False
+
+
+def detectar_codificacao(amostra):
+    for codificacao in CODIFICACOES:
+        if codificacao == "utf-8-sig" and not amostra.startswith(codecs.BOM_UTF8):
+            continue
+        try:
+            # final=False tolera um caractere multibyte cortado no fim da amostra
+            codecs.getincrementaldecoder(codificacao)().decode(amostra, final=False)
+            return codificacao
+        except UnicodeDecodeError:
+            continue
+
+    return "latin-1"
+
+
+def detectar_dialeto(amostra, codificacao):
+    texto = amostra.decode(codificacao, errors="ignore")
+
+    # Descartar a última linha, que pode estar incompleta
+    linhas = texto.splitlines()[:-1] or texto.splitlines()
+    texto = "\n".join(linhas)
+
+    dialeto = {"sep": ",", "quotechar": '"'}
+
+    if not texto:
+        return dialeto
+
+    try:
+        sniff = csv.Sniffer().sniff(texto, delimiters="".join(DELIMITADORES))
+        dialeto["sep"] = sniff.delimiter
+        dialeto["quotechar"] = sniff.quotechar or '"'
+    except csv.Error:
+        # Sniffer falhou → escolher o delimitador mais frequente no cabeçalho
+        cabecalho = linhas[0] if linhas else ""
+        dialeto["sep"] = max(DELIMITADORES, key=cabecalho.count)
+
+    return dialeto
+
+
+# ==========================================================
+# 📥 Leitura em blocos
+# ==========================================================
+def _novo_descarte():
+    return {"linhas": 0, "exemplos": []}
+
+
+def _registrar_descarte(descartes, descricao):
+    descartes["linhas"] += 1
+    if len(descartes["exemplos"]) < MAX_EXEMPLOS_DESCARTE:
+        descartes["exemplos"].append(descricao)
+
+
+def _blocos_pandas(arquivo, dialeto, codificacao, linhas_por_bloco, descartes, tolerante=False):
+    if tolerante:
+        # Modo tolerante (aspas sem fechamento etc.): motor Python com aspas
+        # tratadas como texto comum; linhas com campos a mais são contadas
+        def _pular(campos):
+            _registrar_descarte(descartes, f"Linha com {len(campos)} campos: {dialeto['sep'].join(campos)[:200]}")
+            return None
+
+        opcoes = {"engine": "python", "quoting": csv.QUOTE_NONE, "on_bad_lines": _pular}
+    else:
+        # "warn": o motor C avisa cada linha com campos a mais; os avisos são
+        # contados em vez de a linha sumir em silêncio
+        opcoes = {"engine": "c", "quotechar": dialeto["quotechar"], "on_bad_lines": "warn", "low_memory": False}
+
+    leitor = pd.read_csv(
+        arquivo,
+        sep=dialeto["sep"],
+        encoding=codificacao,
+        encoding_errors="replace",
+        chunksize=linhas_por_bloco,
+        **opcoes,
+    )
+    with leitor:
+        while True:
+            with warnings.catch_warnings(record=True) as avisos:
+                warnings.simplefilter("always", pd.errors.ParserWarning)
+                bloco = next(leitor, None)
+
+            for aviso in avisos:
+                for linha in re.findall(r"Skipping line \d+: [^\n]*", str(aviso.message)):
+                    _registrar_descarte(descartes, linha)
+
+            if bloco is None:
+                return
+            yield bloco
+
+
+def _blocos_pyarrow(arquivo, dialeto, codificacao, bytes_por_bloco, descartes):
+    from pyarrow import csv as pa_csv
+
+    def _pular(linha):
+        _registrar_descarte(descartes, f"Skipping line {linha.number}: {linha.text[:200]}")
+        return "skip"
+
+    leitor = pa_csv.open_csv(
+        arquivo,
+        read_options=pa_csv.ReadOptions(
+            encoding="utf-8" if codificacao == "utf-8-sig" else codificacao,
+            block_size=bytes_por_bloco,
+        ),
+        parse_options=pa_csv.ParseOptions(
+            delimiter=dialeto["sep"],
+            quote_char=dialeto["quotechar"],
+            invalid_row_handler=_pular,
+        ),
+    )
+    for lote in leitor:
+        yield lote.to_pandas()
+
+
+def ler_csv_em_blocos(
+    fonte, linhas_por_bloco=200_000, motor="c", dialeto=None, codificacao=None, descartes=None, tolerante=False
+):
+    # descartes: dict preenchido com linhas malformadas puladas (contagem + exemplos)
+    descartes = descartes if descartes is not None else _novo_descarte()
+    arquivo, deve_fechar = _abrir_binario(fonte)
+    blocos = None
+
+    try:
+        amostra = arquivo.read(TAMANHO_AMOSTRA)
+        arquivo.seek(0)
+
+        codificacao = codificacao or detectar_codificacao(amostra)
+        dialeto = dialeto or detectar_dialeto(amostra, codificacao)
+
+        if tolerante:
+            blocos = _blocos_pandas(arquivo, dialeto, codificacao, linhas_por_bloco, descartes, tolerante=True)
+        elif motor == "pyarrow":
+            # O leitor do pyarrow trabalha por bytes; estimar ~100 bytes por linha
+            blocos = _blocos_pyarrow(arquivo, dialeto, codificacao, max(linhas_por_bloco * 100, 1 << 20), descartes)
+        else:
+            blocos = _blocos_pandas(arquivo, dialeto, codificacao, linhas_por_bloco, descartes)
+
+        for bloco in blocos:
+            yield bloco
+    finally:
+        # Leitura interrompida (ex.: limite de memória): fecha o leitor antes do arquivo
+        if blocos is not None:
+            blocos.close()
+        if deve_fechar:
+            arquivo.close()
+
+
+def _juntar_blocos(blocos, limite_memoria_mb):
+    lidos = []
+    memoria = 0
+
+    for bloco in blocos:
+        tamanho = bloco.memory_usage(deep=True).sum()
+
+        # Limite conferido antes de guardar o bloco (o primeiro sempre entra)
+        if lidos and limite_memoria_mb is not None and memoria + tamanho > limite_memoria_mb * 1024 * 1024:
+            return lidos, memoria, True
+
+        lidos.append(bloco)
+        memoria += tamanho
+
+    return lidos, memoria, False
+
+
+def ler_csv(fonte, linhas_por_bloco=200_000, limite_memoria_mb=None, motor="c"):
+    inicio = time.perf_counter()
+
+    arquivo, deve_fechar = _abrir_binario(fonte)
+    amostra = arquivo.read(TAMANHO_AMOSTRA)
+    if deve_fechar:
+        arquivo.close()
+
+    codificacao = detectar_codificacao(amostra)
+    dialeto = detectar_dialeto(amostra, codificacao)
+
+    blocos = []
+    memoria = 0
+    truncado = False
+    descartes = _novo_descarte()
+    erro_leitura = None
+
+    if amostra.strip():
+        try:
+            blocos, memoria, truncado = _juntar_blocos(
+                ler_csv_em_blocos(fonte, linhas_por_bloco, motor, dialeto, codificacao, descartes), limite_memoria_mb
+            )
+        except ValueError as e:
+            # ParserError (ex.: "EOF inside string") ou ArrowInvalid: relê em modo
+            # tolerante em vez de derrubar o upload; o erro vai para o info
+            erro_leitura = f"{type(e).__name__}: {e}"
+            descartes = _novo_descarte()
+            blocos, memoria, truncado = _juntar_blocos(
+                ler_csv_em_blocos(fonte, linhas_por_bloco, motor, dialeto, codificacao, descartes, tolerante=True),
+                limite_memoria_mb
+            )
+
+    linhas = sum(len(bloco) for bloco in blocos)
+
+    # O concat copia os blocos: o pico de memória fica em ~2x o limite
+    if blocos:
+        df = pd.concat(blocos, ignore_index=True) if len(blocos) > 1 else blocos[0]
+    else:
+        df = pd.DataFrame()
+
+    segundos = time.perf_counter() - inicio
+
+    info = {
+        "codificacao": codificacao,
+        "delimitador": dialeto["sep"],
+        "aspas": dialeto["quotechar"],
+        "linhas": linhas,
+        "memoria_mb": round(float(memoria) / (1024 * 1024), 2),
+        "segundos": round(segundos, 3),
+        "linhas_por_segundo": int(linhas / segundos) if segundos > 0 else linhas,
+        "truncado": truncado,
+        "linhas_descartadas": descartes["linhas"],
+        "exemplos_descartados": descartes["exemplos"],
+        "modo_tolerante": erro_leitura is not None,
+        "erro_leitura": erro_leitura,
+    }
+
+    return df, info
@@ -0,0 +1,24 @@
+import streamlit as st
+
+from fila_tarefas import CONCLUIDA, cancelar, em_andamento, estado_tarefa
+
+
+# ==========================================================
+# ⏳ Acompanhamento de tarefas em segundo plano na interface
+# ==========================================================
+@st.fragment(run_every=1)
+def painel_tarefa(id_tarefa, rotulo="Tarefa"):
+    # Só este trecho reexecuta a cada segundo; o resto da página fica parado
+    estado = estado_tarefa(id_tarefa)
+    if estado is None:
+        return
+
+    if estado["estado"] == CONCLUIDA:
+        st.rerun()
+
+    if em_andamento(estado):
+        st.progress(estado.get("progresso") or 0.0, text=f"⏳ {rotulo}: {estado.get('mensagem') or estado['estado']}")
+        if st.button("⛔ Cancelar", key=f"cancelar_{id_tarefa}"):
+            cancelar(id_tarefa)
+    else:
+        st.warning(f"⚠ {rotulo}: {estado['estado']}" + (f" — {estado['erro']}" if estado.get("erro") else ""))
@@ -0,0 +1,124 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from correlacao import matriz_heatmap, pares_correlacionados
+from fila_tarefas import progresso, verificar_cancelamento
+
+
+# ==========================================================
+# 🧾 Perfil de colunas compartilhado (Insights, Auto-EDA, Dashboard...)
+# ==========================================================
+TIPOS_NUMERICOS = ("int64", "float64")
+MAX_CATEGORIAS = 1000
+MAX_PERFIS = 4
+TOP_PARES_CORR = 100
+AMOSTRA_CORR = 500_000
+
+_perfis = OrderedDict()
+_trava = threading.Lock()
+
+
+def _eh_coluna_texto(serie):
+    return serie.dtype == "object" or isinstance(serie.dtype, pd.StringDtype)
+
+
+def fingerprint_df(df):
+    h = hashlib.blake2b(digest_size=16)
+
+    # Estrutura + conteúdo completo, uma coluna por vez (memória de uma coluna):
+    # qualquer célula alterada muda a chave. ~0,3 s por milhão de linhas × 5 colunas
+    h.update(repr((df.shape, [str(c) for c in df.columns], [str(t) for t in df.dtypes])).encode("utf-8"))
+
+    for i in range(df.shape[1]):
+        h.update(pd.util.hash_pandas_object(df.iloc[:, i], index=False).to_numpy().tobytes())
+
+    return h.hexdigest()
+
+
+def _describe_categorico(linhas, faltantes, contagens, colunas):
+    dados = {}
+    for col in colunas:
+        vc = contagens[col]
+        dados[col] = {
+            "count": linhas - faltantes[col],
+            "unique": vc.attrs["nunique"],
+            "top": vc.index[0] if len(vc) else np.nan,
+            "freq": vc.iloc[0] if len(vc) else np.nan,
+        }
+
+    return pd.DataFrame(dados, index=["count", "unique", "top", "freq"], dtype=object)
+
+
+def calcular_perfil(df):
+    faltantes = df.isna().sum()
+
+    numericas = [col for col in df.columns if str(df[col].dtype) in TIPOS_NUMERICOS]
+    categoricas = [col for col in df.columns if _eh_coluna_texto(df[col])]
+
+    # Uma passada por coluna: value_counts já entrega nunique, top e freq
+    nunique = {}
+    contagens = {}
+    passo = max(1, len(df.columns) // 20)
+    for i, col in enumerate(df.columns):
+        serie = df[col]
+
+        # Em tarefa de fundo: progresso a cada ~5% das colunas, cancelamento a cada uma
+        if i % passo == 0:
+            progresso(0.6 * i / len(df.columns), f"Perfil da coluna {col}")
+        else:
+            verificar_cancelamento()
+
+        if col in categoricas:
+            vc = serie.value_counts()
+            nunique[col] = len(vc)
+            vc = vc.head(MAX_CATEGORIAS)
+            vc.attrs["nunique"] = nunique[col]
+            contagens[col] = vc
+        else:
+            nunique[col] = serie.nunique()
+
+    # Pares mais fortes por blocos + heatmap só das colunas relevantes
+    progresso(0.6, "Correlações")
+    pares_corr = pares_correlacionados(df[numericas], top_k=TOP_PARES_CORR, amostra_linhas=AMOSTRA_CORR)
+
+    perfil = {
+        "linhas": df.shape[0],
+        "colunas": df.shape[1],
+        "dtypes": df.dtypes,
+        "faltantes": faltantes,
+        "nunique": pd.Series(nunique, dtype="int64").reindex(df.columns),
+        "numericas": numericas,
+        "categoricas": categoricas,
+        "describe_num": df[numericas].describe() if numericas else pd.DataFrame(),
+        "describe_cat": _describe_categorico(df.shape[0], faltantes, contagens, categoricas),
+        "contagens": contagens,
+        "pares_corr": pares_corr,
+        "corr": matriz_heatmap(df[numericas], pares_corr, amostra_linhas=AMOSTRA_CORR),
+        "duplicadas": int(df.duplicated().sum()),
+    }
+
+    return perfil
+
+
+def obter_perfil(df, chave=None):
+    # chave: hash já conhecido do conteúdo (ex.: do arquivo enviado) evita refazer o fingerprint
+    chave = chave or fingerprint_df(df)
+
+    with _trava:
+        if chave in _perfis:
+            _perfis.move_to_end(chave)
+            return _perfis[chave]
+
+    perfil = calcular_perfil(df)
+    perfil["fingerprint"] = chave
+
+    with _trava:
+        _perfis[chave] = perfil
+        while len(_perfis) > MAX_PERFIS:
+            _perfis.popitem(last=False)
+
+    return perfil
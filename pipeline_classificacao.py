@@ -1,18 +1,26 @@
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
+from sklearn.base import clone
 from sklearn.metrics import accuracy_score, classification_report
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
-import shap
+import time
 import warnings
 warnings.filterwarnings("ignore")
 
+from busca_modelos import selecionar_por_halving, treinar_candidatos
+from catalogo_modelos import preprocessadores_por_modelo, selecionar_modelos
+from explicacao_shap import explicar_modelo, nomes_features
+from fila_tarefas import progresso
+from preprocessamento import chave_divisao, montar_pipeline, preparar_matrizes
+from registro_modelos import salvar_modelo
+from validacao_cruzada import validar_candidatos
 
-def treinar_classificacao(df, target):
+
+def treinar_classificacao(
+    df, target, n_jobs=None, pasta_cache=None, orcamento_segundos=None, cv=None, arvores_adaptativas=False,
+    pasta_modelos=None, esquema=None
+):
+    inicio = time.perf_counter()
 
     # ===============================
     # 1) Separar X e y
@@ -23,24 +31,16 @@ def treinar_classificacao(df, target):
     # ===============================
     # 2) Detectar colunas numéricas e categóricas
     # ===============================
-    cat_cols = X.select_dtypes(include=["object"]).columns.tolist()
-    num_cols = X.select_dtypes(include=["int64","float64"]).columns.tolist()
-
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("cat", OneHotEncoder(handle_unknown='ignore'), cat_cols),
-            ("num", "passthrough", num_cols)
-        ]
-    )
+    # Encoding por coluna conforme a cardinalidade (one-hot, target, hashing);
+    # modelos com categóricas nativas recebem códigos ordinais
+    catalogo = selecionar_modelos("classificacao", X)
+    preprocessadores = preprocessadores_por_modelo(catalogo, X)
 
     # ===============================
     # 3) Modelos que vamos testar
     # ===============================
-    modelos = {
-        "RandomForest": RandomForestClassifier(n_estimators=200, random_state=42),
-        "LogisticRegression": LogisticRegression(max_iter=1000),
-        "GradientBoosting": GradientBoostingClassifier()
-    }
+    # Candidatos do catálogo conforme o tamanho/forma dos dados
+    modelos = {nome: item["modelo"] for nome, item in catalogo.items()}
 
     resultados = {}
     melhor_modelo = None
@@ -54,49 +54,126 @@ def treinar_classificacao(df, target):
     )
 
     # ===============================
-    # 5) Treinar modelos
+    # 5) Treinar modelos (em paralelo, dentro do orçamento de núcleos)
     # ===============================
-    for nome, modelo in modelos.items():
+    progresso(0.1, "Ajustando encoding e treinando candidatos")
+
+    # Encoding ajustado uma única vez por tipo de entrada; candidatos do mesmo tipo
+    # compartilham as matrizes (preprocessadores iguais caem no mesmo cache)
+    chave_dados = chave_divisao(X_train, X_test, y_train)
+    matrizes = {
+        nome: preparar_matrizes(
+            preprocessadores[nome], X_train, X_test, y_train, pasta_cache=pasta_cache, chave_dados=chave_dados
+        )
+        for nome in modelos
+    }
+    X_train_por_modelo = {nome: m["X_train"] for nome, m in matrizes.items()}
+    X_test_por_modelo = {nome: m["X_test"] for nome, m in matrizes.items()}
 
-        clf = Pipeline(steps=[
-            ("prep", preprocessor),
-            ("model", modelo)
-        ])
+    candidatos = {nome: clone(modelo) for nome, modelo in modelos.items()}
 
-        clf.fit(X_train, y_train)
-        preds = clf.predict(X_test)
-        acc = accuracy_score(y_test, preds)
+    tempos = {}
+    crescimento = {}
 
+    historico = None
+    validacao = None
+
+    if cv:
+        # k-fold no treino para escolher o modelo; o holdout mede só o vencedor
+        validacao = validar_candidatos(
+            candidatos, preprocessadores, X_train, y_train, accuracy_score,
+            k=cv, estratificar=True, n_jobs=n_jobs, pasta_cache=pasta_cache, adaptativo=arvores_adaptativas
+        )
+        escolhido = max(validacao, key=lambda nome: np.mean(validacao[nome]["scores"]))
+        candidatos = {escolhido: candidatos[escolhido]}
+
+    if orcamento_segundos is None:
+        avaliados = treinar_candidatos(
+            candidatos, X_train_por_modelo, y_train, X_test_por_modelo, y_test, accuracy_score, n_jobs=n_jobs,
+            adaptativo=arvores_adaptativas
+        )
+    else:
+        # Corrida por frações crescentes dos dados, limitada pelo orçamento de tempo
+        avaliados, historico = selecionar_por_halving(
+            candidatos, X_train_por_modelo, y_train, X_test_por_modelo, y_test, accuracy_score,
+            maior_melhor=True, orcamento_segundos=orcamento_segundos, n_jobs=n_jobs,
+            adaptativo=arvores_adaptativas
+        )
+
+    for nome, modelo, acc, segundos in avaliados:
         resultados[nome] = round(acc * 100, 2)
+        tempos[nome] = round(segundos, 3)
+
+        # Árvores efetivamente usadas pelos ensembles adaptativos
+        if hasattr(modelo, "historico_crescimento_"):
+            crescimento[nome] = modelo.historico_crescimento_
 
         if acc > melhor_score:
             melhor_score = acc
-            melhor_modelo = clf
+            melhor_modelo = montar_pipeline(matrizes[nome]["prep"], modelo)
             melhor_nome = nome
 
+    # Com validação cruzada: média/desvio de todos os candidatos numa chave própria
+    # (resultados continua sendo o score no holdout, o que é reportado)
+    resultados_cv = None
+    if validacao is not None:
+        resultados_cv = {
+            nome: {
+                "media": round(float(np.mean(r["scores"])) * 100, 2),
+                "desvio": round(float(np.std(r["scores"])) * 100, 2),
+                "segundos": round(r["segundos"], 3),
+            }
+            for nome, r in validacao.items()
+        }
+
     # ===============================
     # 6) Gerar explicação SHAP
     # ===============================
+    progresso(0.8, "Calculando SHAP")
+
     explicacao = None
+    shap_resultado = None
 
+    # Amostra limitada do treino, em lotes paralelos; valores guardados no relatório
     try:
-        explainer = shap.TreeExplainer(melhor_modelo["model"])
-        shap_values = explainer.shap_values(
-            preprocessor.fit_transform(X)
+        shap_resultado = explicar_modelo(
+            melhor_modelo["model"],
+            matrizes[melhor_nome]["X_train"],
+            nomes=nomes_features(matrizes[melhor_nome]["prep"]),
+            n_jobs=n_jobs, pasta=pasta_cache
         )
         explicacao = "SHAP gerado com sucesso."
-    except:
+    except Exception:
         explicacao = "SHAP não pôde ser gerado para este modelo."
 
     # ===============================
     # 7) Relatório final
     # ===============================
+    progresso(0.95, "Gerando relatório")
+
     relatorio = {
         "melhor_modelo": melhor_nome,
         "acuracia": round(melhor_score * 100, 2),
         "resultados": resultados,
+        "resultados_cv": resultados_cv,
+        "tempos": tempos,
+        "historico": historico,
+        "crescimento": crescimento,
+        "oof": {nome: r["oof"] for nome, r in validacao.items()} if validacao else None,
+        "oof_proba": {nome: r["oof_proba"] for nome, r in validacao.items()} if validacao else None,
         "explicacao": explicacao,
+        "shap": shap_resultado,
         "objeto_modelo": melhor_modelo
     }
 
+    # Vencedor persistido em models/<alvo>_classificacao/v<n> com métricas e esquema
+    relatorio["registro"] = None
+    if pasta_modelos is not None:
+        relatorio["registro"] = salvar_modelo(
+            melhor_modelo, f"{target}_classificacao",
+            metricas={"acuracia": relatorio["acuracia"], "resultados": resultados, "resultados_cv": resultados_cv},
+            esquema=esquema, df=df, segundos_treino=round(time.perf_counter() - inicio, 3),
+            pasta=pasta_modelos, explicacao=shap_resultado
+        )
+
     return relatorio
@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+from joblib import Parallel, delayed
+
+from data_cleaning import aplicar_esquema
+from leitura_csv import ler_csv_em_blocos
+from registro_modelos import PASTA_MODELOS, carregar_metadados, carregar_modelo
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# ==========================================================
+# 🏭 Pontuação em lote de pipelines salvos no registro
+# ==========================================================
+# Entrada lida em blocos (CSV ou Parquet), cada bloco limpo com o esquema do
+# modelo e pontuado num pool de processos; a saída é gravada bloco a bloco,
+# na ordem da entrada, sem nunca juntar o arquivo inteiro na memória.
+LINHAS_POR_BLOCO = 200_000
+
+
+def _pico_memoria_mb():
+    if resource is None:
+        return None
+
+    # ru_maxrss vem em KB no Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _eh_parquet(caminho):
+    return str(caminho).lower().endswith((".parquet", ".pq"))
+
+
+def _ler_blocos(entrada, linhas_por_bloco, descartes):
+    if _eh_parquet(entrada):
+        import pyarrow.parquet as pq
+
+        for lote in pq.ParquetFile(entrada).iter_batches(batch_size=linhas_por_bloco):
+            yield lote.to_pandas()
+    else:
+        yield from ler_csv_em_blocos(entrada, linhas_por_bloco, descartes=descartes)
+
+
+def _pontuar_bloco(bloco, nome, versao, pasta, esquema, probabilidades, colunas_id):
+    # Cada worker carrega o modelo uma vez (cache do registro) e o reaproveita
+    modelo = carregar_modelo(nome, versao, pasta)
+
+    # Colunas de ID copiadas como vieram (antes da limpeza)
+    saida = pd.DataFrame(index=bloco.index)
+    for col in colunas_id or []:
+        saida[col] = bloco[col].to_numpy()
+
+    if esquema is not None:
+        bloco = aplicar_esquema(bloco, esquema)
+
+    saida["predicao"] = modelo.predict(bloco)
+
+    if probabilidades and hasattr(modelo, "predict_proba"):
+        proba = modelo.predict_proba(bloco)
+        for i, classe in enumerate(modelo.classes_):
+            saida[f"proba_{classe}"] = proba[:, i]
+
+    return saida, _pico_memoria_mb()
+
+
+def _escrever(estado, df):
+    if estado["parquet"]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        if estado["escritor"] is None:
+            estado["escritor"] = pq.ParquetWriter(estado["saida"], tabela.schema)
+        estado["escritor"].write_table(tabela)
+    else:
+        df.to_csv(estado["saida"], mode="a" if estado["blocos"] else "w", header=not estado["blocos"], index=False)
+
+    estado["blocos"] += 1
+
+
+def pontuar_arquivo(
+    entrada, saida, nome, versao=None, pasta=PASTA_MODELOS, linhas_por_bloco=LINHAS_POR_BLOCO,
+    n_jobs=None, probabilidades=False, colunas_id=None
+):
+    metadados = carregar_metadados(nome, versao, pasta)
+    versao = metadados["versao"]
+    esquema = metadados.get("esquema")
+
+    # Arquivo parcial de uma execução anterior não pode receber append
+    if os.path.exists(saida):
+        os.remove(saida)
+
+    # Número de blocos é desconhecido de antemão: um worker por núcleo do orçamento
+    paralelos = n_jobs if n_jobs and n_jobs > 0 else (os.cpu_count() or 1)
+
+    inicio = time.perf_counter()
+    linhas = 0
+    pico_workers = 0.0
+    descartes = {"linhas": 0, "exemplos": []}
+
+    # Gerador: no máximo 2 blocos por worker em voo → memória limitada
+    resultados = Parallel(n_jobs=paralelos, backend="loky", return_as="generator", pre_dispatch="2*n_jobs")(
+        delayed(_pontuar_bloco)(bloco, nome, versao, pasta, esquema, probabilidades, colunas_id)
+        for bloco in _ler_blocos(entrada, linhas_por_bloco, descartes)
+    )
+
+    estado = {"saida": saida, "parquet": _eh_parquet(saida), "escritor": None, "blocos": 0}
+    try:
+        for pontuado, pico in resultados:
+            _escrever(estado, pontuado)
+            linhas += len(pontuado)
+            pico_workers = max(pico_workers, pico or 0.0)
+    finally:
+        if estado["escritor"] is not None:
+            estado["escritor"].close()
+
+    segundos = time.perf_counter() - inicio
+
+    return {
+        "modelo": nome,
+        "versao": versao,
+        "linhas": linhas,
+        # Linhas malformadas da entrada (campos a mais) ficam sem predição
+        "linhas_descartadas_leitura": descartes["linhas"],
+        "exemplos_descartados": descartes["exemplos"],
+        "blocos": estado["blocos"],
+        "processos": paralelos,
+        "segundos": round(segundos, 3),
+        "linhas_por_segundo": round(linhas / segundos, 1) if segundos > 0 else None,
+        "pico_memoria_mb": _pico_memoria_mb(),
+        "pico_memoria_worker_mb": pico_workers or None,
+        "saida": saida,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pontua um CSV/Parquet com um modelo do registro.")
+    parser.add_argument("entrada")
+    parser.add_argument("saida")
+    parser.add_argument("--modelo", required=True, help="nome do modelo em models/")
+    parser.add_argument("--versao", type=int, default=None, help="padrão: última versão")
+    parser.add_argument("--pasta", default=PASTA_MODELOS)
+    parser.add_argument("--linhas-por-bloco", type=int, default=LINHAS_POR_BLOCO)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("--probabilidades", action="store_true")
+    parser.add_argument("--id", action="append", dest="colunas_id", help="coluna copiada para a saída")
+    args = parser.parse_args(argv)
+
+    relatorio = pontuar_arquivo(
+        args.entrada, args.saida, args.modelo, versao=args.versao, pasta=args.pasta,
+        linhas_por_bloco=args.linhas_por_bloco, n_jobs=args.n_jobs,
+        probabilidades=args.probabilidades, colunas_id=args.colunas_id
+    )
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, OrdinalEncoder, TargetEncoder
+
+from perfil_dados import fingerprint_df
+
+
+# ==========================================================
+# 🏷 Encoding de categóricas escolhido pela cardinalidade
+# ==========================================================
+LIMITE_ONEHOT = 20
+LIMITE_TARGET = 1000
+RAZAO_ID = 0.5
+HASH_FEATURES = 2 ** 10
+MIN_FREQUENCIA = 0.01
+MAX_CATEGORIAS_NATIVAS = 255
+
+
+def _hash_colunas(X, n_features=HASH_FEATURES):
+    # Hashing vetorizado → matriz esparsa (1 valor ativo por coluna original)
+    X = pd.DataFrame(X)
+    n = len(X)
+
+    colunas = [
+        (pd.util.hash_pandas_object(X[col].astype(str), index=False).to_numpy() + np.uint64(j) * np.uint64(0x9E3779B97F4A7C15))
+        % np.uint64(n_features)
+        for j, col in enumerate(X.columns)
+    ]
+
+    indices = np.concatenate(colunas).astype(np.int64) if colunas else np.empty(0, dtype=np.int64)
+    linhas = np.tile(np.arange(n), len(colunas))
+
+    return sp.csr_matrix((np.ones(len(indices)), (linhas, indices)), shape=(n, n_features))
+
+
+def escolher_encoding(serie, com_alvo=True):
+    n_distintos = serie.nunique()
+
+    # Coluna tipo ID / texto livre → hashing (tamanho fixo, não cresce com os dados)
+    if n_distintos > LIMITE_TARGET or n_distintos > RAZAO_ID * max(serie.notna().sum(), 1):
+        return "hashing"
+
+    if n_distintos <= LIMITE_ONEHOT:
+        return "onehot"
+
+    # Cardinalidade média → 1 coluna por feature (target encoding fora do fold)
+    return "target" if com_alvo else "ordinal"
+
+
+def _colunas_nativas(X, cat_cols):
+    # Boosting por histograma trata até max_bins (255) categorias por coluna
+    return [col for col in cat_cols if X[col].nunique() <= MAX_CATEGORIAS_NATIVAS]
+
+
+def n_categoricas_nativas(X):
+    return len(_colunas_nativas(X, X.select_dtypes(include=["object"]).columns.tolist()))
+
+
+def _preprocessador_nativo(X, cat_cols, num_cols, com_alvo=True):
+    nativas = _colunas_nativas(X, cat_cols)
+    outras = [col for col in cat_cols if col not in nativas]
+
+    # Categóricas nativas primeiro: o modelo as recebe pelos índices 0..k-1.
+    # Desconhecidas/faltantes → NaN, que o histograma trata como faltante.
+    transformers = []
+
+    if nativas:
+        transformers.append(("nativa", OrdinalEncoder(
+            handle_unknown="use_encoded_value", unknown_value=np.nan, encoded_missing_value=np.nan
+        ), nativas))
+
+    if outras:
+        transformers.append(("target", TargetEncoder(random_state=42) if com_alvo else OrdinalEncoder(
+            handle_unknown="use_encoded_value", unknown_value=-1, encoded_missing_value=-2
+        ), outras))
+
+    transformers.append(("num", "passthrough", num_cols))
+
+    return ColumnTransformer(transformers=transformers)
+
+
+def construir_preprocessador(X, com_alvo=True, nativo=False):
+    cat_cols = X.select_dtypes(include=["object"]).columns.tolist()
+    num_cols = X.select_dtypes(include=["int64", "float64"]).columns.tolist()
+
+    if nativo:
+        return _preprocessador_nativo(X, cat_cols, num_cols, com_alvo)
+
+    grupos = {"onehot": [], "target": [], "ordinal": [], "hashing": []}
+    for col in cat_cols:
+        grupos[escolher_encoding(X[col], com_alvo)].append(col)
+
+    transformers = []
+
+    if grupos["onehot"]:
+        # Categorias raras agrupadas numa só coluna ("infrequent")
+        transformers.append(("cat", OneHotEncoder(
+            handle_unknown="infrequent_if_exist", min_frequency=MIN_FREQUENCIA, sparse_output=True
+        ), grupos["onehot"]))
+
+    if grupos["target"]:
+        # fit_transform usa validação cruzada interna → codificação fora do fold
+        transformers.append(("target", TargetEncoder(random_state=42), grupos["target"]))
+
+    if grupos["ordinal"]:
+        transformers.append(("ordinal", OrdinalEncoder(
+            handle_unknown="use_encoded_value", unknown_value=-1, encoded_missing_value=-2
+        ), grupos["ordinal"]))
+
+    if grupos["hashing"]:
+        transformers.append(("hash", FunctionTransformer(
+            _hash_colunas, kw_args={"n_features": HASH_FEATURES}, accept_sparse=True
+        ), grupos["hashing"]))
+
+    transformers.append(("num", "passthrough", num_cols))
+
+    return ColumnTransformer(transformers=transformers)
+
+
+def _para_denso(X):
+    return X.toarray() if sp.issparse(X) else X
+
+
+def aceita_esparso(modelo):
+    try:
+        return modelo.__sklearn_tags__().input_tags.sparse
+    except AttributeError:
+        return True
+
+
+def entrada_para(modelo, X):
+    # Matriz continua esparsa, exceto para modelos que só aceitam denso
+    return X if aceita_esparso(modelo) else _para_denso(X)
+
+
+def montar_pipeline(prep, modelo):
+    passos = [("prep", prep)]
+    if not aceita_esparso(modelo):
+        passos.append(("denso", FunctionTransformer(_para_denso, accept_sparse=True)))
+    passos.append(("model", modelo))
+
+    return Pipeline(steps=passos)
+
+
+# ==========================================================
+# 🧱 Pré-processamento ajustado uma vez por divisão treino/teste
+# ==========================================================
+# Todos os candidatos (e a explicação SHAP) reutilizam as mesmas matrizes
+# transformadas, em vez de cada Pipeline refazer o encoding.
+MAX_MATRIZES = 8
+
+_matrizes = OrderedDict()
+_trava = threading.Lock()
+
+
+def chave_divisao(X_train, X_test, y_train=None):
+    # Impressão da divisão: calculada uma vez pelo chamador e reaproveitada por
+    # todos os candidatos, em vez de re-hashear os dados a cada preparar_matrizes
+    return joblib.hash((
+        None if y_train is None else np.asarray(y_train),
+        fingerprint_df(X_train),
+        fingerprint_df(X_test),
+        X_train.index.to_numpy(),
+        X_test.index.to_numpy(),
+    ))
+
+
+def _chave_matrizes(preprocessor, chave_dados):
+    return joblib.hash((chave_dados, preprocessor.get_params(deep=True)))
+
+
+def _em_disco(matriz, caminho):
+    # Grava e reabre em modo memmap: os processos dos candidatos leem o mesmo arquivo
+    joblib.dump(matriz, caminho)
+    return joblib.load(caminho, mmap_mode="r")
+
+
+def preparar_matrizes(preprocessor, X_train, X_test, y_train=None, pasta_cache=None, chave_dados=None):
+    if chave_dados is None:
+        chave_dados = chave_divisao(X_train, X_test, y_train)
+    chave = _chave_matrizes(preprocessor, chave_dados)
+
+    with _trava:
+        if chave in _matrizes:
+            _matrizes.move_to_end(chave)
+            return _matrizes[chave]
+
+    # fit_transform no treino: o target encoding usa codificação fora do fold
+    prep = clone(preprocessor)
+    Xt = prep.fit_transform(X_train, y_train)
+    Xv = prep.transform(X_test)
+
+    if pasta_cache is not None:
+        os.makedirs(pasta_cache, exist_ok=True)
+        Xt = _em_disco(Xt, os.path.join(pasta_cache, f"{chave}_train.joblib"))
+        Xv = _em_disco(Xv, os.path.join(pasta_cache, f"{chave}_test.joblib"))
+
+    matrizes = {"prep": prep, "X_train": Xt, "X_test": Xv, "chave": chave}
+
+    with _trava:
+        _matrizes[chave] = matrizes
+        while len(_matrizes) > MAX_MATRIZES:
+            _matrizes.popitem(last=False)
+
+    return matrizes
+
+
+def empilhar(*matrizes):
+    if any(sp.issparse(m) for m in matrizes):
+        return sp.vstack(matrizes, format="csr")
+
+    return np.vstack(matrizes)
@@ -0,0 +1,193 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import joblib
+import sklearn
+
+from perfil_dados import fingerprint_df
+
+
+# ==========================================================
+# 📦 Registro versionado de modelos em models/
+# ==========================================================
+# models/<nome>/v<n>/modelo.joblib + metadados.json (+ shap.joblib com os
+# valores SHAP calculados no treino, reaproveitados sem recalcular). Com mmap=True o arquivo
+# vai sem compressão e é aberto em modo memmap: os arrays numpy do modelo (nós
+# do HistGradientBoosting, coeficientes, matrizes grandes) ficam no page cache
+# do sistema e são compartilhados por todos os processos que leem o mesmo
+# arquivo. As árvores do RandomForest copiam os nós ao carregar (Tree do
+# sklearn); para elas, compartilhar exige carregar antes de criar os workers.
+# A pasta vem de AUTOML_PASTA_MODELOS.
+PASTA_MODELOS = os.environ.get("AUTOML_PASTA_MODELOS", "models")
+ARQUIVO_MODELO = "modelo.joblib"
+ARQUIVO_METADADOS = "metadados.json"
+ARQUIVO_SHAP = "shap.joblib"
+COMPRESSAO = 3
+MAX_MODELOS_CARREGADOS = 8
+
+_carregados = OrderedDict()
+_trava = threading.Lock()
+
+
+def nome_seguro(nome):
+    # O nome vem do alvo (ex.: "receita/mês_classificacao"): vira um único
+    # diretório, sem separadores nem ".." que escapem de models/
+    limpo = re.sub(r"[^\w.-]", "_", str(nome)).lstrip(".")
+    if not limpo:
+        raise ValueError(f"Nome de modelo inválido: {nome!r}")
+
+    return limpo
+
+
+def _raiz_modelo(pasta, nome):
+    raiz = os.path.join(pasta, nome_seguro(nome))
+
+    base = os.path.realpath(pasta)
+    if os.path.dirname(os.path.realpath(raiz)) != base:
+        raise ValueError(f"Nome de modelo fora de {pasta}: {nome!r}")
+
+    return raiz
+
+
+def _pasta_versao(pasta, nome, versao):
+    return os.path.join(_raiz_modelo(pasta, nome), f"v{versao}")
+
+
+def versoes_modelo(nome, pasta=PASTA_MODELOS):
+    raiz = _raiz_modelo(pasta, nome)
+    if not os.path.isdir(raiz):
+        return []
+
+    return sorted(
+        int(item[1:]) for item in os.listdir(raiz)
+        if item.startswith("v") and item[1:].isdigit()
+        and os.path.exists(os.path.join(raiz, item, ARQUIVO_METADADOS))
+    )
+
+
+def _reservar_versao(pasta, nome):
+    # makedirs sem exist_ok é atômico: dois processos nunca pegam a mesma versão
+    versao = (max(versoes_modelo(nome, pasta), default=0)) + 1
+    while True:
+        try:
+            os.makedirs(_pasta_versao(pasta, nome, versao))
+            return versao
+        except FileExistsError:
+            versao += 1
+
+
+def salvar_modelo(
+    modelo, nome, metricas=None, esquema=None, df=None, segundos_treino=None,
+    pasta=PASTA_MODELOS, mmap=True, compressao=COMPRESSAO, explicacao=None
+):
+    nome = nome_seguro(nome)
+    os.makedirs(_raiz_modelo(pasta, nome), exist_ok=True)
+    versao = _reservar_versao(pasta, nome)
+    destino = _pasta_versao(pasta, nome, versao)
+
+    inicio = time.perf_counter()
+    caminho = os.path.join(destino, ARQUIVO_MODELO)
+
+    # memmap exige arquivo sem compressão; comprimido ocupa menos disco
+    joblib.dump(modelo, caminho, compress=0 if mmap else compressao)
+
+    # Explicação ao lado do modelo: mesma versão, mesmo ciclo de vida
+    shap_info = None
+    if explicacao is not None:
+        joblib.dump(explicacao, os.path.join(destino, ARQUIVO_SHAP), compress=compressao)
+        shap_info = {
+            "chave": explicacao.get("chave"),
+            "linhas": int(explicacao["valores"].shape[0]),
+            "limitado_por_tempo": explicacao.get("limitado_por_tempo"),
+        }
+
+    metadados = {
+        "nome": nome,
+        "versao": versao,
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+        "classe": type(modelo).__name__,
+        "formato": "mmap" if mmap else "comprimido",
+        "tamanho_mb": round(os.path.getsize(caminho) / (1024 * 1024), 3),
+        "segundos_gravacao": round(time.perf_counter() - inicio, 3),
+        "segundos_treino": segundos_treino,
+        "metricas": metricas or {},
+        "esquema": esquema,
+        "fingerprint": fingerprint_df(df) if df is not None else None,
+        "shap": shap_info,
+        "sklearn": sklearn.__version__,
+    }
+
+    # Metadados por último: a versão só aparece na listagem quando está completa
+    with open(os.path.join(destino, ARQUIVO_METADADOS), "w", encoding="utf-8") as f:
+        json.dump(metadados, f, ensure_ascii=False, indent=2, default=str)
+
+    return metadados
+
+
+def carregar_metadados(nome, versao=None, pasta=PASTA_MODELOS):
+    versoes = versoes_modelo(nome, pasta)
+    if not versoes:
+        raise FileNotFoundError(f"Modelo '{nome}' não encontrado em {pasta}")
+
+    versao = versoes[-1] if versao is None else versao
+    with open(os.path.join(_pasta_versao(pasta, nome, versao), ARQUIVO_METADADOS), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def listar_modelos(pasta=PASTA_MODELOS):
+    # Só lê os JSONs; nenhum modelo é carregado
+    if not os.path.isdir(pasta):
+        return []
+
+    return [
+        carregar_metadados(nome, versao, pasta)
+        for nome in sorted(os.listdir(pasta))
+        if os.path.isdir(os.path.join(pasta, nome))
+        for versao in versoes_modelo(nome, pasta)
+    ]
+
+
+def carregar_modelo(nome, versao=None, pasta=PASTA_MODELOS):
+    metadados = carregar_metadados(nome, versao, pasta)
+    caminho = os.path.join(_pasta_versao(pasta, nome, metadados["versao"]), ARQUIVO_MODELO)
+    chave = os.path.abspath(caminho)
+
+    with _trava:
+        if chave in _carregados:
+            _carregados.move_to_end(chave)
+            return _carregados[chave]
+
+    # Carregado só quando pedido; arrays grandes ficam mapeados do disco
+    modelo = joblib.load(caminho, mmap_mode="r" if metadados["formato"] == "mmap" else None)
+
+    with _trava:
+        _carregados[chave] = modelo
+        while len(_carregados) > MAX_MODELOS_CARREGADOS:
+            _carregados.popitem(last=False)
+
+    return modelo
+
+
+def carregar_explicacao(nome, versao=None, pasta=PASTA_MODELOS):
+    # None quando a versão foi salva sem explicação
+    metadados = carregar_metadados(nome, versao, pasta)
+    if not metadados.get("shap"):
+        return None
+
+    return joblib.load(os.path.join(_pasta_versao(pasta, nome, metadados["versao"]), ARQUIVO_SHAP))
+
+
+def remover_versao(nome, versao, pasta=PASTA_MODELOS):
+    destino = _pasta_versao(pasta, nome, versao)
+
+    with _trava:
+        _carregados.pop(os.path.abspath(os.path.join(destino, ARQUIVO_MODELO)), None)
+
+    for arquivo in os.listdir(destino):
+        os.remove(os.path.join(destino, arquivo))
+    os.rmdir(destino)
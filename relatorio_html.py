@@ -0,0 +1,289 @@
+import argparse
+import base64
+import hashlib
+import html
+import io
+import json
+import os
+import time
+
+import pandas as pd
+import seaborn as sns
+from joblib import Parallel, delayed
+from matplotlib.figure import Figure
+
+from busca_modelos import dividir_nucleos
+from correlacao import matriz_heatmap, pares_correlacionados
+from fila_tarefas import progresso
+from graficos_eda import TOP_CATEGORIAS, agregar_histograma
+from leitura_csv import ler_csv
+from perfil_dados import AMOSTRA_CORR, TIPOS_NUMERICOS, TOP_PARES_CORR
+
+
+# ==========================================================
+# 🗂 Relatório de EDA estático (HTML autocontido) em reports/
+# ==========================================================
+# Cada coluna vira uma seção HTML renderizada num processo do pool e guardada
+# em reports/.secoes/<hash do conteúdo>.html. Gerar de novo depois de mudar
+# parte dos dados só renderiza as colunas cujo conteúdo mudou; a visão geral
+# (formato, ausentes, correlações) depende de todas e é sempre refeita.
+# A pasta vem de AUTOML_PASTA_RELATORIOS. O cache de seções é podado pelo uso
+# mais antigo ao passar de MAX_MB_SECOES, e os relatórios gerados pelo app
+# (um arquivo por dataset) ficam limitados a MAX_RELATORIOS_POR_DADOS.
+PASTA_RELATORIOS = os.environ.get("AUTOML_PASTA_RELATORIOS", "reports")
+PASTA_SECOES = ".secoes"
+PREFIXO_POR_DADOS = "eda_"
+MAX_MB_SECOES = 256
+MAX_RELATORIOS_POR_DADOS = 20
+VERSAO_SECOES = 1
+DPI_GRAFICOS = 80
+MAX_COLUNAS_FALTANTES = 50
+
+_ESTILO = """
+body { font-family: -apple-system, Segoe UI, Roboto, sans-serif; margin: 2rem auto; max-width: 1100px; color: #222; }
+h1 { border-bottom: 2px solid #4a7bd0; padding-bottom: .3rem; }
+section { border: 1px solid #ddd; border-radius: 6px; padding: 1rem; margin: 1rem 0; }
+.coluna { display: flex; gap: 1.5rem; align-items: flex-start; flex-wrap: wrap; }
+table { border-collapse: collapse; font-size: .85rem; }
+td, th { border: 1px solid #ddd; padding: .2rem .5rem; text-align: right; }
+nav a { margin-right: .6rem; font-size: .85rem; }
+.meta { color: #666; font-size: .85rem; }
+"""
+
+
+def hash_coluna(serie):
+    h = hashlib.blake2b(digest_size=16)
+
+    # Nome, tipo e conteúdo completo; a versão invalida seções de um layout antigo
+    h.update(repr((VERSAO_SECOES, str(serie.name), str(serie.dtype))).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(serie, index=False).to_numpy().tobytes())
+
+    return h.hexdigest()
+
+
+def _png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=DPI_GRAFICOS, bbox_inches="tight")
+    return f'<img src="data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode("ascii")}">'
+
+
+def _tabela(dados):
+    return pd.Series(dados, dtype=object).to_frame("valor").to_html(header=False, border=0)
+
+
+# ----------------------------------------------------------
+# Seções por coluna (executadas nos workers)
+# ----------------------------------------------------------
+# Figure direto (sem pyplot): nada de estado global nem figura para fechar
+def _secao_numerica(nome, valores):
+    serie = pd.Series(valores)
+    resumo = serie.describe()
+
+    dados = {"ausentes": int(serie.isna().sum()), "distintos": int(serie.nunique())}
+    dados.update({chave: round(float(v), 6) for chave, v in resumo.items()})
+
+    fig = Figure(figsize=(5, 3))
+    ax = fig.subplots()
+    hist = agregar_histograma(valores, minimo=resumo.get("min"), maximo=resumo.get("max"))
+    if hist is not None:
+        ax.stairs(hist["contagens"], hist["arestas"], fill=True, alpha=0.5)
+        ax.plot(hist["x_kde"], hist["kde"], linewidth=1.5)
+    ax.set_title(f"Distribuição de {nome}")
+
+    return _montar_secao(nome, "numérica", _tabela(dados), _png(fig))
+
+
+def _secao_categorica(nome, valores):
+    serie = pd.Series(valores)
+    contagens = serie.value_counts()
+
+    dados = {
+        "ausentes": int(serie.isna().sum()),
+        "distintos": len(contagens),
+        "mais frequente": contagens.index[0] if len(contagens) else "",
+        "frequência": int(contagens.iloc[0]) if len(contagens) else 0,
+    }
+
+    fig = Figure(figsize=(5, 3))
+    ax = fig.subplots()
+    topo = contagens.head(TOP_CATEGORIAS)
+    ax.bar(range(len(topo)), topo.to_numpy())
+    ax.set_xticks(range(len(topo)))
+    ax.set_xticklabels([str(c)[:15] for c in topo.index], rotation=90, fontsize=7)
+    ax.set_title(f"Frequência das Categorias — {nome}")
+
+    return _montar_secao(nome, "categórica", _tabela(dados), _png(fig))
+
+
+def _montar_secao(nome, tipo, tabela, imagem):
+    return (
+        f'<section id="{html.escape(_ancora(nome))}"><h3>{html.escape(str(nome))} '
+        f'<span class="meta">({tipo})</span></h3><div class="coluna">{tabela}{imagem}</div></section>'
+    )
+
+
+def _ancora(nome):
+    return "col-" + hashlib.blake2b(str(nome).encode("utf-8"), digest_size=6).hexdigest()
+
+
+def _renderizar_coluna(nome, valores, numerica):
+    return _secao_numerica(nome, valores) if numerica else _secao_categorica(nome, valores)
+
+
+# ----------------------------------------------------------
+# Visão geral (processo principal)
+# ----------------------------------------------------------
+def _visao_geral(df, numericas):
+    faltantes = df.isna().sum()
+    partes = [
+        "<section><h2>📌 Informações Gerais</h2>",
+        _tabela({
+            "linhas": len(df),
+            "colunas": df.shape[1],
+            "numéricas": len(numericas),
+            "memória (MB)": round(df.memory_usage(deep=False).sum() / 1024 ** 2, 1),
+            "células ausentes": int(faltantes.sum()),
+        }),
+        "<h3>Tipos e ausentes</h3>",
+        pd.DataFrame({"tipo": df.dtypes.astype(str), "ausentes": faltantes})
+        .sort_values("ausentes", ascending=False).head(MAX_COLUNAS_FALTANTES).to_html(border=0),
+        "</section>",
+    ]
+
+    if len(numericas) > 1:
+        pares = pares_correlacionados(df[numericas], top_k=TOP_PARES_CORR, amostra_linhas=AMOSTRA_CORR)
+        corr = matriz_heatmap(df[numericas], pares, amostra_linhas=AMOSTRA_CORR)
+
+        fig = Figure(figsize=(8, 6))
+        ax = fig.subplots()
+        sns.heatmap(corr, annot=len(corr) <= 15, cmap="Blues", ax=ax)
+        ax.set_title("Mapa de Correlação")
+
+        partes += [
+            "<section><h2>🔗 Correlações</h2>", _png(fig),
+            "<h3>Pares mais correlacionados</h3>", pares.head(20).to_html(border=0, index=False), "</section>",
+        ]
+
+    return "".join(partes)
+
+
+def _gravar(caminho, texto):
+    # Gravação atômica: um relatório aberto no navegador nunca aparece pela metade
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(temporario, caminho)
+
+
+def arquivo_por_dados(chave):
+    # Um arquivo por dataset: relatórios de dados diferentes nunca se sobrescrevem
+    return f"{PREFIXO_POR_DADOS}{chave}"
+
+
+def _podar(pasta, prefixo="", maximo_bytes=None, maximo_arquivos=None, manter=()):
+    # Remove os arquivos usados há mais tempo (mtime) até caber nos limites
+    arquivos = []
+    for entrada in os.scandir(pasta):
+        if entrada.is_file() and entrada.name.startswith(prefixo) and entrada.name.endswith(".html"):
+            info = entrada.stat()
+            arquivos.append((info.st_mtime, info.st_size, entrada.path))
+    arquivos.sort(reverse=True)
+
+    manter = set(manter)
+    total = 0
+    for i, (_, tamanho, caminho) in enumerate(arquivos):
+        total += tamanho
+        estourou = (maximo_bytes is not None and total > maximo_bytes) or (
+            maximo_arquivos is not None and i >= maximo_arquivos
+        )
+        if estourou and caminho not in manter:
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+
+
+def gerar_relatorio_html(df, nome="eda", pasta=PASTA_RELATORIOS, n_jobs=None, arquivo=None, incluir_html=False):
+    inicio = time.perf_counter()
+    pasta_secoes = os.path.join(pasta, PASTA_SECOES)
+    os.makedirs(pasta_secoes, exist_ok=True)
+
+    numericas = [col for col in df.columns if str(df[col].dtype) in TIPOS_NUMERICOS]
+
+    progresso(0.05, "Calculando hash das colunas")
+    hashes = {col: hash_coluna(df[col]) for col in df.columns}
+    arquivos = {col: os.path.join(pasta_secoes, f"{hashes[col]}.html") for col in df.columns}
+    pendentes = [col for col in df.columns if not os.path.exists(arquivos[col])]
+
+    # Só as colunas novas/alteradas vão para o pool; arrays numéricos grandes
+    # chegam aos workers por memmap (joblib), sem cópia por pickle
+    if pendentes:
+        paralelos, _ = dividir_nucleos(len(pendentes), n_jobs)
+        secoes = Parallel(n_jobs=paralelos, backend="loky", return_as="generator", pre_dispatch="2*n_jobs")(
+            delayed(_renderizar_coluna)(col, df[col].to_numpy(), col in numericas) for col in pendentes
+        )
+        for i, (col, secao) in enumerate(zip(pendentes, secoes)):
+            _gravar(arquivos[col], secao)
+            progresso(0.1 + 0.7 * (i + 1) / len(pendentes), f"Seção da coluna {col}")
+
+    # Seções reaproveitadas contam como usadas agora (poda pelo uso mais antigo)
+    for col in df.columns:
+        if col not in pendentes:
+            os.utime(arquivos[col])
+
+    progresso(0.85, "Visão geral e correlações")
+    visao = _visao_geral(df, numericas)
+
+    indice = "".join(f'<a href="#{html.escape(_ancora(col))}">{html.escape(str(col))}</a>' for col in df.columns)
+    corpo = []
+    for col in df.columns:
+        with open(arquivos[col], encoding="utf-8") as f:
+            corpo.append(f.read())
+
+    documento = (
+        f'<!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8">'
+        f"<title>Auto-EDA — {html.escape(nome)}</title><style>{_ESTILO}</style></head><body>"
+        f"<h1>📊 Relatório Automático de EDA — {html.escape(nome)}</h1>"
+        f'<p class="meta">Gerado em {time.strftime("%Y-%m-%d %H:%M:%S")}</p>'
+        f"{visao}<h2>📊 Colunas</h2><nav>{indice}</nav>{''.join(corpo)}</body></html>"
+    )
+
+    caminho = os.path.join(pasta, f"{arquivo or nome}.html")
+    _gravar(caminho, documento)
+
+    _podar(pasta_secoes, maximo_bytes=MAX_MB_SECOES * 1024 ** 2, manter=arquivos.values())
+    _podar(pasta, PREFIXO_POR_DADOS, maximo_arquivos=MAX_RELATORIOS_POR_DADOS, manter=[caminho])
+
+    relatorio = {
+        "caminho": caminho,
+        "colunas": df.shape[1],
+        "renderizadas": len(pendentes),
+        "reaproveitadas": df.shape[1] - len(pendentes),
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "tamanho_kb": round(os.path.getsize(caminho) / 1024, 1),
+    }
+
+    # O app baixa o próprio conteúdo gerado: não depende do arquivo continuar lá
+    if incluir_html:
+        relatorio["html"] = documento.encode("utf-8")
+
+    return relatorio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera o relatório de EDA em HTML autocontido.")
+    parser.add_argument("entrada", help="CSV de entrada")
+    parser.add_argument("--nome", default=None, help="nome do arquivo em reports/ (padrão: nome da entrada)")
+    parser.add_argument("--pasta", default=PASTA_RELATORIOS)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    df, _ = ler_csv(args.entrada)
+    nome = args.nome or os.path.splitext(os.path.basename(args.entrada))[0]
+
+    relatorio = gerar_relatorio_html(df, nome=nome, pasta=args.pasta, n_jobs=args.n_jobs)
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from data_cleaning import aplicar_esquema
+from registro_modelos import PASTA_MODELOS, carregar_metadados, carregar_modelo, listar_modelos
+
+
+# ==========================================================
+# 🛰 Servidor local de inferência com micro-lotes
+# ==========================================================
+# Requisições de uma linha que chegam juntas são agrupadas num único predict
+# vetorizado. Os modelos ficam carregados (quentes) nos processos do pool;
+# os pré-carregados vão para os workers por fork, compartilhando memória.
+LOTE_MAX = 256
+ESPERA_LOTE_MS = 5
+TIMEOUT_SEGUNDOS = 30
+JANELA_LATENCIAS = 10_000
+# "Mais recente" é resolvida de novo depois disso: uma versão nova publicada
+# com o servidor no ar passa a atender sem reiniciar
+VALIDADE_METADADOS_SEGUNDOS = 5
+
+_barreira = None
+
+
+def _prever_lote(nome, versao, pasta, linhas, esquema, probabilidades):
+    modelo = carregar_modelo(nome, versao, pasta)
+
+    X = pd.DataFrame(linhas)
+    if esquema is not None:
+        X = aplicar_esquema(X, esquema)
+
+    resposta = {"predicoes": np.asarray(modelo.predict(X)).tolist()}
+
+    if probabilidades and hasattr(modelo, "predict_proba"):
+        resposta["classes"] = np.asarray(modelo.classes_).tolist()
+        resposta["probabilidades"] = modelo.predict_proba(X).tolist()
+
+    return resposta
+
+
+def _iniciar_worker(barreira):
+    global _barreira
+    _barreira = barreira
+
+
+def _aquecer(modelos, pasta):
+    # Executado em cada worker: garante o modelo no cache do processo. A barreira
+    # só abre quando todos os workers seguram uma tarefa de aquecimento, então
+    # nenhum worker pega duas e todos estão prontos ao final
+    for nome, versao in modelos:
+        carregar_modelo(nome, versao, pasta)
+    _barreira.wait(TIMEOUT_SEGUNDOS)
+    return os.getpid()
+
+
+def _percentil(valores, q):
+    return round(float(np.percentile(valores, q)), 3) if valores else None
+
+
+def criar_estado(pasta=PASTA_MODELOS, n_workers=None, pre_carregar=(), lote_max=LOTE_MAX, espera_ms=ESPERA_LOTE_MS):
+    n_workers = n_workers if n_workers and n_workers > 0 else (os.cpu_count() or 1)
+    pre_carregar = [(nome, None) for nome in pre_carregar]
+
+    # Carregar antes do fork: os workers herdam os modelos já na memória
+    for nome, versao in pre_carregar:
+        carregar_modelo(nome, versao, pasta)
+
+    contexto = multiprocessing.get_context()
+    pool = ProcessPoolExecutor(
+        max_workers=n_workers, mp_context=contexto,
+        initializer=_iniciar_worker, initargs=(contexto.Barrier(n_workers),)
+    )
+
+    # Um aquecimento por worker força a criação de todos antes das threads do servidor
+    pids = [f.result() for f in [pool.submit(_aquecer, pre_carregar, pasta) for _ in range(n_workers)]]
+
+    return {
+        "pasta": pasta,
+        "pool": pool,
+        "workers": sorted(set(pids)),
+        # Um lote em voo por worker: enquanto estão ocupados, a fila acumula e o
+        # próximo lote sai maior (lote se adapta à carga)
+        "vagas": threading.BoundedSemaphore(n_workers),
+        "lote_max": lote_max,
+        "espera": espera_ms / 1000,
+        "filas": {},
+        "metadados": {},
+        "trava": threading.Lock(),
+        "inicio": time.time(),
+        "requisicoes": 0,
+        "erros": 0,
+        "linhas": 0,
+        "lotes": 0,
+        "latencias_ms": deque(maxlen=JANELA_LATENCIAS),
+        "tamanhos_lote": deque(maxlen=JANELA_LATENCIAS),
+    }
+
+
+def _metadados(estado, nome, versao):
+    # Versão fixa é imutável; "mais recente" expira e é resolvida de novo
+    chave = (nome, versao)
+    with estado["trava"]:
+        atual = estado["metadados"].get(chave)
+
+    if atual is None or (versao is None and time.monotonic() - atual[0] > VALIDADE_METADADOS_SEGUNDOS):
+        atual = (time.monotonic(), carregar_metadados(nome, versao, estado["pasta"]))
+        with estado["trava"]:
+            estado["metadados"][chave] = atual
+
+    return atual[1]
+
+
+def _agrupador(estado, nome, versao, fila):
+    while True:
+        pedidos = [fila.get()]
+        if pedidos[0] is None:
+            return
+
+        estado["vagas"].acquire()
+
+        # Junta o que chegar até completar o lote ou estourar a espera
+        linhas = len(pedidos[0]["linhas"])
+        limite = time.perf_counter() + estado["espera"]
+        while linhas < estado["lote_max"]:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                pedido = fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            if pedido is None:
+                fila.put(None)
+                break
+            pedidos.append(pedido)
+            linhas += len(pedido["linhas"])
+
+        try:
+            metadados = _metadados(estado, nome, versao)
+            modelo = (nome, metadados["versao"], metadados.get("esquema"))
+            probabilidades = any(p["probabilidades"] for p in pedidos)
+            todas = [linha for p in pedidos for linha in p["linhas"]]
+            futuro = estado["pool"].submit(
+                _prever_lote, nome, modelo[1], estado["pasta"], todas, modelo[2], probabilidades
+            )
+        except Exception as e:
+            estado["vagas"].release()
+            _falhar(pedidos, str(e))
+            continue
+
+        # Próximo lote já pode ser montado enquanto este roda no pool
+        futuro.add_done_callback(
+            lambda f, pedidos=pedidos, modelo=modelo: _concluir_lote(estado, pedidos, f, modelo)
+        )
+
+
+def _falhar(pedidos, erro):
+    for p in pedidos:
+        p["erro"] = erro
+        p["evento"].set()
+
+
+def _concluir_lote(estado, pedidos, futuro, modelo):
+    estado["vagas"].release()
+
+    with estado["trava"]:
+        estado["lotes"] += 1
+        estado["tamanhos_lote"].append(sum(len(p["linhas"]) for p in pedidos))
+
+    try:
+        resposta = futuro.result()
+    except Exception as e:
+        if len(pedidos) == 1:
+            _falhar(pedidos, str(e))
+            return
+
+        # Uma linha inválida não derruba o lote: cada pedido roda sozinho e só
+        # o que falhar de novo recebe o erro
+        nome, versao, esquema = modelo
+        for p in pedidos:
+            try:
+                individual = estado["pool"].submit(
+                    _prever_lote, nome, versao, estado["pasta"], p["linhas"], esquema, p["probabilidades"]
+                )
+            except Exception as erro:
+                _falhar([p], str(erro))
+                continue
+            individual.add_done_callback(lambda f, p=p: _distribuir([p], f))
+        return
+
+    _distribuir(pedidos, futuro, resposta)
+
+
+def _distribuir(pedidos, futuro, resposta=None):
+    if resposta is None:
+        try:
+            resposta = futuro.result()
+        except Exception as e:
+            _falhar(pedidos, str(e))
+            return
+
+    inicio = 0
+    for p in pedidos:
+        fim = inicio + len(p["linhas"])
+        p["resposta"] = {
+            chave: valor[inicio:fim] if chave != "classes" else valor
+            for chave, valor in resposta.items()
+        }
+        p["evento"].set()
+        inicio = fim
+
+
+def _fila_do_modelo(estado, nome, versao):
+    chave = (nome, versao)
+
+    with estado["trava"]:
+        if chave not in estado["filas"]:
+            # Modelo inexistente falha aqui (404), antes de criar a fila
+            estado["metadados"][chave] = (time.monotonic(), carregar_metadados(nome, versao, estado["pasta"]))
+            fila = queue.Queue()
+            threading.Thread(target=_agrupador, args=(estado, nome, versao, fila), daemon=True).start()
+            estado["filas"][chave] = fila
+
+        return estado["filas"][chave]
+
+
+def prever(estado, nome, linhas, versao=None, probabilidades=False):
+    if not isinstance(linhas, list) or not linhas or not all(isinstance(linha, dict) for linha in linhas):
+        raise ValueError("'linhas' deve ser uma lista não vazia de objetos {coluna: valor}")
+
+    inicio = time.perf_counter()
+    pedido = {"linhas": linhas, "probabilidades": probabilidades, "evento": threading.Event(), "resposta": None, "erro": None}
+
+    _fila_do_modelo(estado, nome, versao).put(pedido)
+
+    if not pedido["evento"].wait(TIMEOUT_SEGUNDOS):
+        pedido["erro"] = "tempo esgotado"
+
+    with estado["trava"]:
+        estado["requisicoes"] += 1
+        estado["linhas"] += len(linhas)
+        if pedido["erro"] is not None:
+            estado["erros"] += 1
+        estado["latencias_ms"].append((time.perf_counter() - inicio) * 1000)
+
+    if pedido["erro"] is not None:
+        raise RuntimeError(pedido["erro"])
+
+    return pedido["resposta"]
+
+
+def metricas(estado):
+    with estado["trava"]:
+        latencias = list(estado["latencias_ms"])
+        tamanhos = list(estado["tamanhos_lote"])
+        decorrido = time.time() - estado["inicio"]
+
+        return {
+            "requisicoes": estado["requisicoes"],
+            "erros": estado["erros"],
+            "linhas": estado["linhas"],
+            "lotes": estado["lotes"],
+            "tamanho_medio_lote": round(float(np.mean(tamanhos)), 2) if tamanhos else None,
+            "latencia_p50_ms": _percentil(latencias, 50),
+            "latencia_p95_ms": _percentil(latencias, 95),
+            "latencia_p99_ms": _percentil(latencias, 99),
+            "requisicoes_por_segundo": round(estado["requisicoes"] / decorrido, 2) if decorrido > 0 else None,
+            "linhas_por_segundo": round(estado["linhas"] / decorrido, 2) if decorrido > 0 else None,
+            "workers": len(estado["workers"]),
+            "modelos_ativos": [nome for nome, _ in estado["filas"]],
+        }
+
+
+def encerrar(estado):
+    for fila in estado["filas"].values():
+        fila.put(None)
+    estado["pool"].shutdown(wait=True, cancel_futures=True)
+
+
+# ==========================================================
+# 🌐 HTTP (biblioteca padrão, sem dependências extras)
+# ==========================================================
+# POST /prever/<modelo>[?versao=N&probabilidades=1]
+#   corpo: {"linhas": [{...}, ...]}  ou uma única linha {"col": valor, ...}
+# GET  /metricas  |  GET /modelos  |  GET /saude
+def _criar_handler(estado):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _responder(self, status, corpo):
+            dados = json.dumps(corpo, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            caminho = urlparse(self.path).path
+            if caminho == "/metricas":
+                self._responder(200, metricas(estado))
+            elif caminho == "/modelos":
+                self._responder(200, listar_modelos(estado["pasta"]))
+            elif caminho == "/saude":
+                self._responder(200, {"ok": True})
+            else:
+                self._responder(404, {"erro": "rota não encontrada"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            partes = url.path.strip("/").split("/")
+            if len(partes) != 2 or partes[0] != "prever":
+                self._responder(404, {"erro": "use POST /prever/<modelo>"})
+                return
+
+            params = parse_qs(url.query)
+            probabilidades = params.get("probabilidades", ["0"])[0] in ("1", "true")
+
+            try:
+                # Parâmetros inválidos (ex.: ?versao=abc) → 400 em JSON, não conexão derrubada
+                versao = int(params["versao"][0]) if "versao" in params else None
+                corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                linhas = corpo["linhas"] if isinstance(corpo, dict) and "linhas" in corpo else [corpo]
+                self._responder(200, prever(estado, partes[1], linhas, versao, probabilidades))
+            except FileNotFoundError as e:
+                self._responder(404, {"erro": str(e)})
+            except Exception as e:
+                self._responder(400, {"erro": str(e)})
+
+        def log_message(self, formato, *args):
+            # Sem log por requisição: as métricas ficam em /metricas
+            pass
+
+    return Handler
+
+
+class _Servidor(ThreadingHTTPServer):
+    # Backlog padrão (5) derruba conexões simultâneas sob carga
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def criar_servidor(host="127.0.0.1", porta=8000, **kwargs):
+    estado = criar_estado(**kwargs)
+    servidor = _Servidor((host, porta), _criar_handler(estado))
+    return servidor, estado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local de inferência para modelos do registro.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--pasta", default=PASTA_MODELOS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--modelo", action="append", default=[], help="modelo pré-carregado (repetível)")
+    parser.add_argument("--lote-max", type=int, default=LOTE_MAX)
+    parser.add_argument("--espera-ms", type=float, default=ESPERA_LOTE_MS)
+    args = parser.parse_args(argv)
+
+    servidor, estado = criar_servidor(
+        args.host, args.porta, pasta=args.pasta, n_workers=args.workers, pre_carregar=args.modelo,
+        lote_max=args.lote_max, espera_ms=args.espera_ms
+    )
+    print(f"Servindo em http://{args.host}:{servidor.server_address[1]} ({len(estado['workers'])} workers)")
+
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        encerrar(estado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from registro_modelos import PASTA_MODELOS
+
+
+# ==========================================================
+# 🔨 Teste de carga do servidor de inferência
+# ==========================================================
+# Dispara requisições de uma linha em paralelo (como vários clientes) contra
+# um servidor já no ar (--url) ou contra um servidor local criado aqui mesmo.
+def _post(url, linha, timeout=30):
+    req = urllib.request.Request(
+        url, data=json.dumps(linha, default=str).encode("utf-8"),
+        headers={"Content-Type": "application/json"}, method="POST"
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resposta:
+        return json.loads(resposta.read())
+
+
+def _get(url, timeout=30):
+    with urllib.request.urlopen(url, timeout=timeout) as resposta:
+        return json.loads(resposta.read())
+
+
+def executar_carga(base, modelo, linhas, requisicoes=1000, concorrencia=32):
+    url = f"{base}/prever/{modelo}"
+    latencias = []
+    erros = 0
+    trava = threading.Lock()
+
+    def uma(i):
+        nonlocal erros
+        inicio = time.perf_counter()
+        try:
+            _post(url, linhas[i % len(linhas)])
+        except Exception:
+            with trava:
+                erros += 1
+            return
+        with trava:
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(uma, range(requisicoes)))
+    segundos = time.perf_counter() - inicio
+
+    return {
+        "requisicoes": requisicoes,
+        "concorrencia": concorrencia,
+        "erros": erros,
+        "segundos": round(segundos, 3),
+        "requisicoes_por_segundo": round(requisicoes / segundos, 1),
+        "latencia_p50_ms": round(float(np.percentile(latencias, 50)), 3) if latencias else None,
+        "latencia_p95_ms": round(float(np.percentile(latencias, 95)), 3) if latencias else None,
+        "latencia_p99_ms": round(float(np.percentile(latencias, 99)), 3) if latencias else None,
+        "servidor": _get(f"{base}/metricas"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de inferência.")
+    parser.add_argument("dados", help="CSV com linhas de exemplo (sem necessidade do alvo)")
+    parser.add_argument("--modelo", required=True)
+    parser.add_argument("--url", default=None, help="servidor já no ar; padrão: sobe um local")
+    parser.add_argument("--pasta", default=PASTA_MODELOS)
+    parser.add_argument("--requisicoes", type=int, default=1000)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    # Linhas cruas, como um cliente mandaria (o servidor aplica o esquema)
+    linhas = pd.read_csv(args.dados, nrows=1000).astype(object).where(lambda d: d.notna(), None).to_dict("records")
+
+    servidor = estado = None
+    base = args.url
+    if base is None:
+        from servidor_inferencia import criar_servidor, encerrar
+
+        servidor, estado = criar_servidor(
+            "127.0.0.1", 0, pasta=args.pasta, n_workers=args.workers, pre_carregar=[args.modelo]
+        )
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    try:
+        relatorio = executar_carga(base.rstrip("/"), args.modelo, linhas, args.requisicoes, args.concorrencia)
+        print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    finally:
+        if servidor is not None:
+            servidor.shutdown()
+            servidor.server_close()
+            encerrar(estado)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,36 @@ from sklearn.metrics import accuracy_score, mean_squared_error
 import shap
 from lime.lime_tabular import LimeTabularExplainer
 import numpy as np
+import matplotlib.pyplot as plt
+import threading
+from collections import OrderedDict
 
+import joblib
+from joblib import Parallel, delayed
 
-def executar_automl(df, target):
+from busca_modelos import dividir_nucleos
+from ensemble_adaptativo import ajustar_em_etapas, crescer_ensemble
+from explicacao_shap import explicar_modelo
+from fila_tarefas import (
+    CONCLUIDA, INTERROMPIDA, em_andamento, estado_tarefa, id_tarefa_para, progresso, resultado_tarefa, submeter,
+)
+from painel_tarefas import painel_tarefa
+from perfil_dados import fingerprint_df
 
-    st.write("🔍 Treinando modelo automaticamente...")
 
+# ==========================================================
+# 🧠 Sessão de treino em cache (sobrevive às reruns)
+# ==========================================================
+# Mexer em qualquer widget reexecuta o script; modelo, métricas e explainers
+# ficam guardados por (dados, alvo, configuração) e só são refeitos se mudarem.
+MAX_SESSOES = 4
+NUM_FEATURES_LIME = 10
+
+_sessoes = OrderedDict()
+_trava = threading.Lock()
+
+
+def _treinar_sessao(df, target, arvores_adaptativas):
     # Separar X e y
     X = df.drop(columns=[target])
     y = df[target]
@@ -24,25 +48,197 @@ def executar_automl(df, target):
         X, y, test_size=0.25, random_state=42
     )
 
+    progresso(0.1, "Treinando modelo")
+
     # Escolher modelo automaticamente
     if problema == "classificacao":
         modelo = RandomForestClassifier(n_estimators=500, random_state=42)
     else:
         modelo = RandomForestRegressor(n_estimators=500, random_state=42)
 
-    modelo.fit(X_train, y_train)
+    # Adaptativo: começa com poucas árvores e para quando o score OOB estabiliza
+    if arvores_adaptativas:
+        crescer_ensemble(modelo, X_train, y_train)
+    else:
+        ajustar_em_etapas(modelo, X_train, y_train)
+
+    progresso(0.6, "Avaliando no teste")
+
+    pred = modelo.predict(X_test)
+    if problema == "classificacao":
+        metricas = {"acuracia": accuracy_score(y_test, pred)}
+    else:
+        metricas = {"rmse": np.sqrt(mean_squared_error(y_test, pred))}
+
+    sessao = {
+        "problema": problema,
+        "modelo": modelo,
+        "X": X,
+        "X_train": X_train,
+        "y_train": y_train,
+        "metricas": metricas,
+        "shap": None,
+        "erro_shap": None,
+        "lime": None,
+        "erro_lime": None,
+        "explicacoes_lime": {},
+    }
+
+    progresso(0.7, "Calculando SHAP")
+
+    try:
+        # Amostra limitada do treino; resultado em cache por (modelo, dados)
+        sessao["shap"] = explicar_modelo(modelo, X_train)
+    except Exception as e:
+        sessao["erro_shap"] = str(e)
+
+    return sessao
+
+
+def _montar_lime(sessao):
+    # Montado no processo do Streamlit: o explainer do LIME guarda lambdas e não
+    # volta serializado do worker; montar é barato perto do treino
+    if sessao["lime"] is not None or sessao["erro_lime"] is not None:
+        return sessao
+
+    try:
+        sessao["lime"] = LimeTabularExplainer(
+            training_data=np.array(sessao["X_train"]),
+            feature_names=sessao["X_train"].columns,
+            class_names=np.unique(sessao["y_train"]).astype(str),
+            mode="classification" if sessao["problema"] == "classificacao" else "regression"
+        )
+    except Exception as e:
+        sessao["erro_lime"] = str(e)
+
+    return sessao
+
+
+def _chave_sessao(df, target, arvores_adaptativas, chave_dados=None):
+    # chave_dados: hash já conhecido pelo app (upload); sem ele o conteúdo
+    # inteiro é hasheado, o que custa caro para repetir a cada rerun
+    return joblib.hash((chave_dados or fingerprint_df(df), target, arvores_adaptativas))
+
+
+def _sessao_em_cache(chave):
+    with _trava:
+        if chave in _sessoes:
+            _sessoes.move_to_end(chave)
+            return _sessoes[chave]
+
+    return None
+
+
+def _guardar_sessao(chave, sessao):
+    _montar_lime(sessao)
+
+    with _trava:
+        _sessoes[chave] = sessao
+        while len(_sessoes) > MAX_SESSOES:
+            _sessoes.popitem(last=False)
+
+    return sessao
+
+
+def obter_sessao(df, target, arvores_adaptativas=False, chave_dados=None):
+    # Versão bloqueante (uso fora da interface)
+    chave = _chave_sessao(df, target, arvores_adaptativas, chave_dados)
+
+    sessao = _sessao_em_cache(chave)
+    if sessao is not None:
+        return sessao, True
+
+    return _guardar_sessao(chave, _treinar_sessao(df, target, arvores_adaptativas)), False
+
+
+def iniciar_sessao(df, target, arvores_adaptativas=False, refazer=False, chave_dados=None):
+    # Versão em segundo plano: devolve (sessão ou None, id da tarefa de treino)
+    chave = _chave_sessao(df, target, arvores_adaptativas, chave_dados)
+
+    sessao = _sessao_em_cache(chave)
+    if sessao is not None:
+        return sessao, None
+
+    id_tarefa = id_tarefa_para("automl", chave)
+    estado = estado_tarefa(id_tarefa)
+
+    # Falha/cancelamento não reinicia sozinho a cada rerun; só a pedido
+    if estado is None or estado["estado"] == INTERROMPIDA or refazer:
+        submeter(_treinar_sessao, df, target, arvores_adaptativas, tipo="automl", chave=chave, descricao=f"AutoML — alvo {target}")
+        estado = estado_tarefa(id_tarefa)
+
+    if estado["estado"] == CONCLUIDA:
+        return _guardar_sessao(chave, resultado_tarefa(id_tarefa)), id_tarefa
+
+    return None, id_tarefa
+
+
+def _explicar_lime(explainer, instancia, predict_fn, num_features):
+    return explainer.explain_instance(data_row=instancia, predict_fn=predict_fn, num_features=num_features)
+
+
+def explicar_linhas_lime(sessao, linhas, n_jobs=None, num_features=NUM_FEATURES_LIME):
+    modelo = sessao["modelo"]
+    predict_fn = modelo.predict_proba if sessao["problema"] == "classificacao" else modelo.predict
+
+    # Linhas já explicadas nesta sessão voltam do cache
+    novas = [linha for linha in dict.fromkeys(linhas) if linha not in sessao["explicacoes_lime"]]
+
+    if novas:
+        # Threads: o modelo é compartilhado (sem cópia por processo) e o predict
+        # das árvores libera o GIL durante a maior parte do trabalho
+        paralelos, _ = dividir_nucleos(len(novas), n_jobs)
+        resultados = Parallel(n_jobs=paralelos, backend="threading")(
+            delayed(_explicar_lime)(sessao["lime"], sessao["X"].iloc[linha].values, predict_fn, num_features)
+            for linha in novas
+        )
+        sessao["explicacoes_lime"].update(zip(novas, resultados))
+
+    return {linha: sessao["explicacoes_lime"][linha] for linha in linhas}
+
+
+def _ler_ids(texto, maximo):
+    ids = []
+    for parte in texto.replace(";", ",").split(","):
+        parte = parte.strip()
+        if parte.isdigit() and int(parte) <= maximo:
+            ids.append(int(parte))
+    return ids
+
+
+def executar_automl(df, target, arvores_adaptativas=False, chave_dados=None):
+
+    # Sem chave explícita: a do upload, se este df é o da sessão (como chave_do_df no app)
+    if chave_dados is None and st.session_state.get("df") is df:
+        chave_dados = st.session_state.get("chave_df")
+
+    # Treino num processo separado: a página continua respondendo enquanto isso
+    refazer = st.session_state.pop("refazer_automl", False)
+    sessao, id_tarefa = iniciar_sessao(df, target, arvores_adaptativas, refazer=refazer, chave_dados=chave_dados)
+
+    if sessao is None:
+        painel_tarefa(id_tarefa, "🔍 Treinando modelo automaticamente")
+        if not em_andamento(estado_tarefa(id_tarefa)) and st.button("🔁 Treinar novamente"):
+            st.session_state["refazer_automl"] = True
+            st.rerun()
+        return
+
+    if id_tarefa is None:
+        st.caption("♻ Sessão de treino reaproveitada (mesmos dados, alvo e configuração)")
+
+    modelo = sessao["modelo"]
+    X_train = sessao["X_train"]
+
+    if arvores_adaptativas:
+        st.caption(f"🌲 {modelo.n_estimators} árvores (crescimento parou quando o score OOB estabilizou)")
 
     # --------------------
     # 🔥 Avaliação
     # --------------------
-    if problema == "classificacao":
-        pred = modelo.predict(X_test)
-        score = accuracy_score(y_test, pred)
-        st.success(f"📌 Acurácia: **{round(score*100,2)}%**")
+    if sessao["problema"] == "classificacao":
+        st.success(f"📌 Acurácia: **{round(sessao['metricas']['acuracia']*100,2)}%**")
     else:
-        pred = modelo.predict(X_test)
-        rmse = np.sqrt(mean_squared_error(y_test, pred))
-        st.success(f"📌 RMSE: **{round(rmse,4)}**")
+        st.success(f"📌 RMSE: **{round(sessao['metricas']['rmse'],4)}**")
 
     st.divider()
     st.subheader("🧠 Interpretabilidade — SHAP e LIME")
@@ -53,17 +249,23 @@ def executar_automl(df, target):
     st.markdown("### 🌈 SHAP — Importância das Features")
 
     try:
-        explainer = shap.TreeExplainer(modelo)
-        shap_values = explainer.shap_values(X_train)
+        if sessao["shap"] is None:
+            raise ValueError(sessao["erro_shap"])
+
+        shap_values, amostra = sessao["shap"]["valores"], sessao["shap"]["X"]
 
         st.write("🔍 Importância Global das Features")
+        st.caption(f"Calculado sobre {len(amostra)} de {len(X_train)} linhas do treino")
 
-        fig = shap.summary_plot(shap_values, X_train, plot_type="bar", show=False)
-        st.pyplot(fig)
+        # summary_plot desenha na figura corrente e devolve None
+        shap.summary_plot(shap_values, amostra, plot_type="bar", show=False)
+        st.pyplot(plt.gcf())
+        plt.close()
 
         st.write("🎨 Distribuição do impacto das features")
-        fig2 = shap.summary_plot(shap_values, X_train, show=False)
-        st.pyplot(fig2)
+        shap.summary_plot(shap_values, amostra, show=False)
+        st.pyplot(plt.gcf())
+        plt.close()
 
     except Exception as e:
         st.warning("⚠ SHAP não pôde ser gerado para este modelo ou dataset.")
@@ -77,27 +279,24 @@ def executar_automl(df, target):
     st.markdown("### 🍋 LIME — Explicação Local (um registro)")
 
     try:
-        lime_explainer = LimeTabularExplainer(
-            training_data=np.array(X_train),
-            feature_names=X_train.columns,
-            class_names=np.unique(y_train).astype(str),
-            mode="classification" if problema == "classificacao" else "regression"
-        )
+        if sessao["lime"] is None:
+            raise ValueError(sessao["erro_lime"])
 
         st.info("Selecione uma linha do dataset para explicar:")
 
         linha = st.number_input("ID da linha (0 até tamanho do dataset)", min_value=0, max_value=len(df)-1)
 
-        instancia = X.iloc[linha]
+        # Várias linhas de uma vez → explicadas em paralelo
+        lote = st.text_input("IDs para explicar em lote (opcional, separados por vírgula)")
 
         if st.button("📌 Gerar Explicação LIME"):
-            exp = lime_explainer.explain_instance(
-                data_row=instancia.values,
-                predict_fn=modelo.predict_proba if problema=="classificacao" else modelo.predict
-            )
+            linhas = _ler_ids(lote, len(df) - 1) or [int(linha)]
+            explicacoes = explicar_linhas_lime(sessao, linhas)
 
             st.write("🔎 Explicação Local (LIME):")
-            st.components.v1.html(exp.as_html(), height=600)
+            for id_linha, exp in explicacoes.items():
+                with st.expander(f"Linha {id_linha}", expanded=len(explicacoes) == 1):
+                    st.components.v1.html(exp.as_html(), height=600)
 
     except Exception as e:
         st.warning("⚠ LIME não pôde ser gerado.")
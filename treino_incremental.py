@@ -0,0 +1,202 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import accuracy_score, mean_squared_error
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MaxAbsScaler
+
+from catalogo_modelos import selecionar_modelos
+from data_cleaning import aplicar_esquema, autofix_csv
+from leitura_csv import ler_csv_em_blocos
+from preprocessamento import construir_preprocessador, entrada_para, montar_pipeline
+
+
+# ==========================================================
+# 💽 Treino fora da memória (partial_fit bloco a bloco)
+# ==========================================================
+# O arquivo nunca é carregado inteiro: o primeiro bloco define a limpeza,
+# o encoding e a escala; os blocos seguintes passam pelos mesmos passos já
+# ajustados e alimentam os modelos incrementais. Uma fração aleatória de cada
+# bloco (sempre as mesmas linhas em todas as passadas) fica de validação, para
+# arquivos ordenados por data ou por classe não enviesarem a avaliação.
+FRACAO_VALIDACAO = 0.1
+MAX_LINHAS_VALIDACAO = 50_000
+
+
+def _coluna_alvo(bloco, target, esquema):
+    # O alvo pode ter sido informado com o nome original (antes de limpar o header)
+    return target if target in bloco.columns else esquema["header"].get(str(target), target)
+
+
+def _limpar_bloco(bloco, esquema):
+    # Primeiro bloco define a limpeza; os demais só aplicam o esquema
+    if esquema is None:
+        bloco, _, esquema = autofix_csv(bloco, retornar_esquema=True)
+    else:
+        bloco = aplicar_esquema(bloco, esquema)
+
+    return bloco, esquema
+
+
+def _construir_prep(X):
+    # Sem target encoding (exigiria o alvo fora do fold); MaxAbs mantém indicadores
+    # esparsos em [0, 1] e a escala fica fixada no 1º bloco
+    return Pipeline(steps=[
+        ("encoding", construir_preprocessador(X, com_alvo=False)),
+        ("imputacao", SimpleImputer(strategy="mean", keep_empty_features=True)),
+        ("escala", MaxAbsScaler()),
+    ])
+
+
+def _varrer_classes(fonte, target, linhas_por_bloco, esquema):
+    # Passada só para o alvo: partial_fit precisa de todas as classes na 1ª chamada.
+    # Informar classes= evita esta leitura extra.
+    classes = set()
+    for bloco in ler_csv_em_blocos(fonte, linhas_por_bloco):
+        bloco, esquema = _limpar_bloco(bloco, esquema)
+        classes.update(bloco[_coluna_alvo(bloco, target, esquema)].dropna().unique().tolist())
+
+    return np.unique(np.asarray(list(classes))), esquema
+
+
+def _sortear_validacao(n, bloco, seed):
+    # Mesmo bloco → mesmo sorteio em todas as passadas; o valor sorteado também
+    # serve de chave para a amostra uniforme quando a validação passa do limite
+    sorteio = np.random.default_rng([seed, bloco]).random(n)
+    return sorteio < FRACAO_VALIDACAO, sorteio
+
+
+def _acumular_validacao(atual, X, y, chaves):
+    novo = X.assign(__alvo=y.to_numpy(), __chave=chaves)
+    junto = novo if atual is None else pd.concat([atual, novo])
+
+    # Fica com as menores chaves aleatórias: amostra uniforme de todos os blocos
+    if len(junto) > MAX_LINHAS_VALIDACAO:
+        junto = junto.nsmallest(MAX_LINHAS_VALIDACAO, "__chave")
+
+    return junto
+
+
+def treinar_fora_de_memoria(
+    fonte, target, problema="classificacao", linhas_por_bloco=100_000, esquema=None, passadas=1,
+    classes=None, seed=42
+):
+    classificacao = problema == "classificacao"
+    metrica = accuracy_score if classificacao else mean_squared_error
+
+    if classificacao:
+        if classes is None:
+            classes, esquema = _varrer_classes(fonte, target, linhas_por_bloco, esquema)
+        classes = np.asarray(classes)
+
+    prep = None
+    modelos = None
+    validacao = None
+    X_val = y_val = None
+
+    historico = []
+    tempos = {}
+    linhas_treino = 0
+    linhas_sem_alvo = 0
+    linhas_classe_desconhecida = 0
+
+    for passada in range(passadas):
+        for i, bloco in enumerate(ler_csv_em_blocos(fonte, linhas_por_bloco)):
+            bloco, esquema = _limpar_bloco(bloco, esquema)
+            alvo = _coluna_alvo(bloco, target, esquema)
+
+            # Descartes contados uma vez (1ª passada) e reportados
+            sem_alvo = bloco[alvo].isna().to_numpy()
+            bloco = bloco[~sem_alvo]
+            if classificacao:
+                conhecida = bloco[alvo].isin(classes).to_numpy()
+                bloco = bloco[conhecida]
+            if passada == 0:
+                linhas_sem_alvo += int(sem_alvo.sum())
+                if classificacao:
+                    linhas_classe_desconhecida += int((~conhecida).sum())
+
+            X, y = bloco.drop(columns=[alvo]), bloco[alvo]
+
+            em_validacao, sorteio = _sortear_validacao(len(X), i, seed)
+            if passada == 0 and em_validacao.any():
+                validacao = _acumular_validacao(
+                    validacao, X[em_validacao], y[em_validacao], sorteio[em_validacao]
+                )
+            X, y = X[~em_validacao], y[~em_validacao]
+
+            if len(X) == 0:
+                continue
+
+            if prep is None:
+                prep = _construir_prep(X).fit(X)
+
+                catalogo = selecionar_modelos(f"{problema}_incremental", X)
+                modelos = {nome: item["modelo"] for nome, item in catalogo.items()}
+                tempos = {nome: 0.0 for nome in modelos}
+
+            # Validação só muda na 1ª passada; transformada de novo quando muda
+            if passada == 0 and validacao is not None:
+                X_val = prep.transform(validacao.drop(columns=["__alvo", "__chave"]))
+                y_val = validacao["__alvo"]
+
+            Xt = prep.transform(X)
+            linhas_treino += len(X)
+
+            for nome, modelo in modelos.items():
+                inicio = time.perf_counter()
+                if classificacao:
+                    modelo.partial_fit(entrada_para(modelo, Xt), y, classes=classes)
+                else:
+                    modelo.partial_fit(entrada_para(modelo, Xt), y)
+                tempos[nome] += time.perf_counter() - inicio
+
+                if y_val is not None:
+                    score = metrica(y_val, modelo.predict(entrada_para(modelo, X_val)))
+                    historico.append({
+                        "passada": passada,
+                        "bloco": i,
+                        "linhas": linhas_treino,
+                        "modelo": nome,
+                        "score": float(score),
+                    })
+
+    if modelos is None or y_val is None:
+        return None
+
+    # Score final de cada modelo na validação completa (amostra de todos os blocos)
+    finais = {
+        nome: float(metrica(y_val, modelo.predict(entrada_para(modelo, X_val))))
+        for nome, modelo in modelos.items()
+    }
+
+    if classificacao:
+        resultados = {nome: round(score * 100, 2) for nome, score in finais.items()}
+        melhor_nome = max(finais, key=finais.get)
+    else:
+        resultados = {nome: round(float(np.sqrt(score)), 4) for nome, score in finais.items()}
+        melhor_nome = min(finais, key=finais.get)
+
+    relatorio = {
+        "melhor_modelo": melhor_nome,
+        "resultados": resultados,
+        "tempos": {nome: round(segundos, 3) for nome, segundos in tempos.items()},
+        "historico": pd.DataFrame(historico),
+        "linhas_treino": linhas_treino,
+        "linhas_validacao": len(y_val),
+        "linhas_sem_alvo": linhas_sem_alvo,
+        "linhas_classe_desconhecida": linhas_classe_desconhecida,
+        "linhas_descartadas": linhas_sem_alvo + linhas_classe_desconhecida,
+        "classes": classes.tolist() if classificacao else None,
+        "esquema": esquema,
+        "objeto_modelo": montar_pipeline(prep, modelos[melhor_nome]),
+    }
+
+    if classificacao:
+        relatorio["acuracia"] = resultados[melhor_nome]
+    else:
+        relatorio["rmse"] = resultados[melhor_nome]
+
+    return relatorio
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import KFold, StratifiedKFold
+from threadpoolctl import threadpool_limits
+
+from busca_modelos import ajustar_modelo, dividir_nucleos, do_candidato, limitar_n_jobs
+from fila_tarefas import verificar_cancelamento
+from perfil_dados import fingerprint_df
+from preprocessamento import entrada_para, preparar_matrizes
+
+
+# ==========================================================
+# 🔁 Validação cruzada paralela (candidato × fold)
+# ==========================================================
+# Índices de fold por (y, k, estratificação, seed): LRU limitado como os
+# demais caches da série (cada entrada guarda ~len(y) inteiros por fold)
+MAX_FOLDS = 16
+
+_folds = OrderedDict()
+_trava = threading.Lock()
+
+
+def obter_folds(y, k=5, estratificar=False, seed=42):
+    # Mesmo y + mesma configuração → mesmos índices, sem recalcular
+    chave = joblib.hash((np.asarray(y), k, estratificar, seed))
+
+    with _trava:
+        if chave in _folds:
+            _folds.move_to_end(chave)
+            return _folds[chave]
+
+    divisor = StratifiedKFold(k, shuffle=True, random_state=seed) if estratificar else KFold(k, shuffle=True, random_state=seed)
+    folds = list(divisor.split(np.zeros(len(y)), y))
+
+    with _trava:
+        _folds[chave] = folds
+        while len(_folds) > MAX_FOLDS:
+            _folds.popitem(last=False)
+
+    return folds
+
+
+def _ajustar_fold(nome, fold, modelo, X_train, y_train, X_val, y_val, metrica, nucleos, adaptativo=False):
+    inicio = time.perf_counter()
+
+    with threadpool_limits(limits=nucleos):
+        limitar_n_jobs(modelo, nucleos)
+        ajustar_modelo(modelo, entrada_para(modelo, X_train), y_train, adaptativo)
+        X_val = entrada_para(modelo, X_val)
+        preds = modelo.predict(X_val)
+        proba = modelo.predict_proba(X_val) if hasattr(modelo, "predict_proba") else None
+
+    classes = getattr(modelo, "classes_", None)
+    return nome, fold, metrica(y_val, preds), time.perf_counter() - inicio, preds, proba, classes
+
+
+def validar_candidatos(
+    candidatos, preprocessor, X, y, metrica, k=5, estratificar=False, n_jobs=None, pasta_cache=None, adaptativo=False
+):
+    folds = obter_folds(y, k, estratificar)
+
+    # Encoding ajustado uma vez por fold (e reaproveitado por todos os candidatos);
+    # preprocessor pode ser {nome: preprocessador} — iguais caem no mesmo cache.
+    # Os dados são hasheados uma vez só; cada fold é identificado pelos índices
+    impressao = joblib.hash((fingerprint_df(X), np.asarray(y)))
+    matrizes = []
+    for treino, val in folds:
+        chave_dados = joblib.hash((impressao, treino, val))
+        matrizes.append({
+            nome: preparar_matrizes(
+                do_candidato(preprocessor, nome), X.iloc[treino], X.iloc[val], y.iloc[treino],
+                pasta_cache=pasta_cache, chave_dados=chave_dados
+            )
+            for nome in candidatos
+        })
+
+    paralelos, por_candidato = dividir_nucleos(len(candidatos) * len(folds), n_jobs)
+
+    tarefas = (
+        delayed(_ajustar_fold)(
+            nome, f, clone(modelo),
+            matrizes[f][nome]["X_train"], y.iloc[treino], matrizes[f][nome]["X_test"], y.iloc[val],
+            metrica, por_candidato, adaptativo
+        )
+        for nome, modelo in candidatos.items()
+        for f, (treino, val) in enumerate(folds)
+    )
+
+    validacao = {
+        nome: {"scores": [None] * len(folds), "segundos": 0.0, "oof": pd.Series(index=y.index, dtype=object), "oof_proba": None}
+        for nome in candidatos
+    }
+
+    # Predições fora do fold guardadas para calibração/stacking sem retreinar
+    resultados = Parallel(n_jobs=paralelos, backend="loky", return_as="generator")(tarefas)
+    for nome, f, score, segundos, preds, proba, classes in resultados:
+        verificar_cancelamento()
+        val = folds[f][1]
+        r = validacao[nome]
+
+        r["scores"][f] = float(score)
+        r["segundos"] += segundos
+        r["oof"].iloc[val] = preds
+
+        if proba is not None:
+            if r["oof_proba"] is None:
+                r["oof_proba"] = pd.DataFrame(np.nan, index=y.index, columns=list(classes))
+            r["oof_proba"].iloc[val, r["oof_proba"].columns.get_indexer(list(classes))] = proba
+
+    for r in validacao.values():
+        r["oof"] = r["oof"].infer_objects()
+
+    return validacao